@@ -2,8 +2,8 @@
 
 Public API (re-exported for backward compatibility with original sd_index_manager module):
   init_db, ensure_fts, fts_exists, drop_fts
-  check_and_repair_db, vacuum_repair_db
-  index_files, de_duplicate_by_hash
+  check_and_repair_db, vacuum_repair_db, backup_db
+  index_files, de_duplicate_by_hash, backfill_hashes
   clear_database, run_webui
   DB_PATH, FTS_REBUILDING_FLAG, BASE_DIR
 
@@ -12,9 +12,10 @@ Internal helpers live in submodules (progress, scanning, etc.).
 
 from .paths import DB_PATH, FTS_REBUILDING_FLAG, BASE_DIR
 from .db_schema import init_db, ensure_fts, fts_exists, drop_fts
-from .db_repair import check_and_repair_db, vacuum_repair_db
+from .db_repair import check_and_repair_db, vacuum_repair_db, backup_db
 from .indexing import index_files
 from .duplicates import de_duplicate_by_hash
+from .hashing import backfill_hashes
 from .cleanup import clear_database
 from .webui_launcher import run_webui
 from .extraction import extract_models
@@ -22,8 +23,8 @@ from .extraction import extract_models
 __all__ = [
   'DB_PATH', 'FTS_REBUILDING_FLAG', 'BASE_DIR',
   'init_db', 'ensure_fts', 'fts_exists', 'drop_fts',
-  'check_and_repair_db', 'vacuum_repair_db',
-  'index_files', 'de_duplicate_by_hash',
+  'check_and_repair_db', 'vacuum_repair_db', 'backup_db',
+  'index_files', 'de_duplicate_by_hash', 'backfill_hashes',
   'clear_database', 'run_webui',
   'extract_models'
 ]
@@ -5,6 +5,7 @@ from .paths import DB_PATH
 from .db_schema import init_db
 from .db_repair import check_and_repair_db, vacuum_repair_db
 from .duplicates import de_duplicate_by_hash
+from .hashing import backfill_hashes
 from .cleanup import clear_database
 from .indexing import index_files
 from .webui_launcher import run_webui
@@ -19,7 +20,8 @@ def main():  # pragma: no cover - interactive
         print("3. Clear database")
         print("4. Run WebUI")
         print("5. De-duplicate files by hash (delete duplicates)")
-        print("6. Exit")
+        print("6. Compute missing file hashes (deferred hashing)")
+        print("7. Exit")
         choice = input("Enter your choice: ")
         if choice == '1':
             index_files()
@@ -57,6 +59,12 @@ def main():  # pragma: no cover - interactive
             except Exception as e:  # pragma: no cover
                 print("Error running duplicate removal:", e)
         elif choice == '6':
+            try:
+                filled = backfill_hashes(DB_PATH)
+                print(f"Hashed {filled} file(s).")
+            except sqlite3.Error as e:
+                print("Error computing file hashes:", e)
+        elif choice == '7':
             print("Goodbye!"); break
         else:
             print("Invalid choice. Try again.")
@@ -0,0 +1,45 @@
+"""SQLite connection helpers shared by the schema, indexing and de-dup paths.
+
+``connect()`` opens a connection and applies the tuning pragma bundle:
+WAL (readers never block the writer), synchronous=NORMAL (no fsync per
+commit under WAL; set SD_SQLITE_SYNCHRONOUS=FULL for maximum durability),
+a 30s busy_timeout so concurrent writers wait instead of failing with
+"database is locked", plus mmap / page-cache / temp-store sizing.
+"""
+from __future__ import annotations
+import os, sqlite3
+
+_SYNCHRONOUS = os.getenv("SD_SQLITE_SYNCHRONOUS", "NORMAL").strip().upper()
+if _SYNCHRONOUS not in {"OFF", "NORMAL", "FULL", "EXTRA"}:
+    _SYNCHRONOUS = "NORMAL"
+
+# Memory-map the whole file for typical libraries; the kernel only maps pages
+# that are touched and SQLite clamps this to its compile-time maximum (2 GiB
+# in stock builds). 0 disables mmap (e.g. for network filesystems).
+try:
+    _MMAP_SIZE = max(0, int(os.getenv("SD_SQLITE_MMAP_MB", "2048"))) * 1024 * 1024
+except ValueError:
+    _MMAP_SIZE = 2048 * 1024 * 1024
+
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", _SYNCHRONOUS),
+    ("busy_timeout", 30000),
+    ("mmap_size", _MMAP_SIZE),
+    ("temp_store", "MEMORY"),
+    ("cache_size", -65536),
+)
+
+def tune_connection(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """Apply PRAGMAS best-effort (a read-only or locked DB simply keeps defaults)."""
+    for name, value in PRAGMAS:
+        try:
+            conn.execute(f"PRAGMA {name} = {value};")
+        except sqlite3.Error:
+            pass
+    return conn
+
+def connect(db_path: str, *, timeout: float = 30.0, **kwargs) -> sqlite3.Connection:
+    return tune_connection(sqlite3.connect(db_path, timeout=timeout, **kwargs))
+
+__all__ = ["PRAGMAS", "tune_connection", "connect"]
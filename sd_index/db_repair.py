@@ -4,6 +4,25 @@ import os, sqlite3, datetime as _dt
 from .paths import DB_PATH
 from .db_schema import init_db
 
+def backup_db(db_path: str = DB_PATH, dest_path: str | None = None, *, pages: int = 1000, progress=None) -> str | None:
+    """Snapshot the database with SQLite's online backup API.
+
+    Copies ``pages`` pages per step so other connections keep making progress
+    and the copy can be interrupted cleanly. Much faster than ``VACUUM INTO``
+    but pages are copied verbatim, so it is NOT a repair: corruption is
+    preserved. ``vacuum_repair_db`` therefore still rebuilds via VACUUM.
+    Returns the destination path, or None on failure.
+    """
+    if dest_path is None:
+        ts = _dt.datetime.now().strftime("%Y%m%d%H%M%S")
+        dest_path = f"{db_path}.backup-{ts}.db"
+    try:
+        with sqlite3.connect(db_path, timeout=5.0) as src, sqlite3.connect(dest_path) as dst:
+            src.backup(dst, pages=pages, progress=progress)
+        return dest_path
+    except (sqlite3.Error, OSError):
+        return None
+
 def vacuum_repair_db(db_path: str = DB_PATH) -> bool:
     try:
         ts = _dt.datetime.now().strftime("%Y%m%d%H%M%S")
@@ -68,14 +87,11 @@ def check_and_repair_db(db_path: str = DB_PATH) -> bool:
         return True
     except PermissionError as e:
         if hasattr(e, 'winerror') and e.winerror == 32:
-            try:
-                ts2 = _dt.datetime.now().strftime("%Y%m%d%H%M%S")
-                backup_name = f"{db_path}.backup-{ts2}.db"
-                with sqlite3.connect(db_path, timeout=5.0) as src, sqlite3.connect(backup_name) as dst:
-                    src.backup(dst)
+            backup_name = backup_db(db_path)
+            if backup_name:
                 print("Database appears in use; backup created at:", backup_name)
-            except Exception as be:
-                print("Failed to create backup while locked:", be)
+            else:
+                print("Failed to create backup while locked.")
             return False
         print("Failed to auto-repair database:", e)
         return False
@@ -83,4 +99,4 @@ def check_and_repair_db(db_path: str = DB_PATH) -> bool:
         print("Failed to auto-repair database:", e)
         return False
 
-__all__ = ['check_and_repair_db', 'vacuum_repair_db']
+__all__ = ['check_and_repair_db', 'vacuum_repair_db', 'backup_db']
@@ -7,6 +7,11 @@ Auto-migrates missing columns for backwards compatibility.
 from __future__ import annotations
 import os, sqlite3, time
 from .paths import DB_PATH
+from .connection import connect
+
+# Trigram tokenizer (SQLite >= 3.34) indexes every 3-gram so quoted terms match
+# substrings (e.g. inside paths) via the index instead of a LIKE '%x%' scan.
+FTS_TOKENIZER = "trigram" if sqlite3.sqlite_version_info >= (3, 34, 0) else None
 
 def fts_exists(conn: sqlite3.Connection) -> bool:
     cur = conn.cursor()
@@ -58,6 +63,8 @@ def ensure_fts(conn: sqlite3.Connection):
                         needs_migration = True
             except sqlite3.Error:
                 needs_migration = True
+            if FTS_TOKENIZER and f"tokenize='{FTS_TOKENIZER}'" not in ddl:
+                needs_migration = True
             try:
                 cursor.execute("PRAGMA table_info(files_fts)")
                 cols = {r[1] for r in cursor.fetchall()}
@@ -82,13 +89,14 @@ def ensure_fts(conn: sqlite3.Connection):
             if exists:
                 drop_fts(conn)
             # Recreate as a standalone (contentless) FTS so we can store derived columns safely.
+            options = f"tokenize='{FTS_TOKENIZER}'" if FTS_TOKENIZER else "prefix='2 3 4'"
             cursor.execute(
-                """
+                f"""
                 CREATE VIRTUAL TABLE files_fts USING fts5(
                     metadata_json,
                     path,
                     path_norm,
-                    prefix='2 3 4'
+                    {options}
                 );
                 """
             )
@@ -197,12 +205,8 @@ def ensure_prompts_fts(conn: sqlite3.Connection):
 
 def init_db():
     creating = not os.path.exists(DB_PATH)
-    with sqlite3.connect(DB_PATH, timeout=10.0) as conn:
+    with connect(DB_PATH) as conn:
         cur = conn.cursor()
-        try:
-            cur.execute("PRAGMA busy_timeout = 10000;")
-        except sqlite3.Error:
-            pass
         cur.execute(
             """
             CREATE TABLE IF NOT EXISTS files (
@@ -292,7 +296,8 @@ def init_db():
         for stmt in [
             "CREATE INDEX IF NOT EXISTS idx_files_last_scanned ON files(last_scanned DESC)",
             "CREATE INDEX IF NOT EXISTS idx_files_last_scanned_id ON files(last_scanned DESC, id DESC)",
-            "CREATE INDEX IF NOT EXISTS idx_files_file_hash ON files(file_hash)",
+            # Covering index: de-dup group lookups (file_hash=? ORDER BY id) never touch the table
+            "CREATE INDEX IF NOT EXISTS idx_files_hash_cover ON files(file_hash, id, file_path, file_size)",
             "CREATE INDEX IF NOT EXISTS idx_files_file_mtime ON files(file_mtime)",
             "CREATE INDEX IF NOT EXISTS idx_files_file_ctime ON files(file_ctime)",
             "CREATE INDEX IF NOT EXISTS idx_files_last_extracted_hash ON files(last_extracted_hash)",
@@ -302,6 +307,13 @@ def init_db():
                 cur.execute(stmt)
             except sqlite3.Error:
                 pass
+        # idx_files_hash_cover (above) already leads on file_hash and serves the
+        # duplicate GROUP BY, the per-group probes and the deferred-hash IS NULL scan;
+        # a second file_hash index would only add write cost on every insert/update.
+        try:
+            cur.execute("DROP INDEX IF EXISTS idx_files_file_hash")
+        except sqlite3.Error:
+            pass
         for col in ("file_size", "width", "height", "file_path"):
             try:
                 cur.execute(f"CREATE INDEX IF NOT EXISTS idx_files_{col}_id ON files({col} DESC, id DESC)")
@@ -314,6 +326,11 @@ def init_db():
             "CREATE INDEX IF NOT EXISTS idx_models_seed ON models(seed)",
             "CREATE INDEX IF NOT EXISTS idx_lora_name ON lora_usages(lora_name)",
             "CREATE INDEX IF NOT EXISTS idx_lora_file ON lora_usages(file_id)",
+            # NOCASE twins back the web UI's model:/sampler:/lora: prefix filters
+            "CREATE INDEX IF NOT EXISTS idx_models_model_name_nocase ON models(model_name COLLATE NOCASE)",
+            "CREATE INDEX IF NOT EXISTS idx_models_sampler_nocase ON models(sampler COLLATE NOCASE)",
+            "CREATE INDEX IF NOT EXISTS idx_models_steps ON models(steps)",
+            "CREATE INDEX IF NOT EXISTS idx_lora_name_nocase ON lora_usages(lora_name COLLATE NOCASE)",
         ]:
             try:
                 cur.execute(stmt)
@@ -323,6 +340,11 @@ def init_db():
             cur.execute("CREATE INDEX IF NOT EXISTS idx_files_file_path_asc ON files(file_path ASC, id ASC)")
         except sqlite3.Error:
             pass
+        # The gallery's file-name sort is COLLATE NOCASE; only a NOCASE index avoids a temp-B-tree sort
+        try:
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_files_file_path_nocase ON files(file_path COLLATE NOCASE, id)")
+        except sqlite3.Error:
+            pass
         # Ensure FTS structures while connection open
         ensure_fts(conn)
         ensure_prompts_fts(conn)
@@ -330,4 +352,4 @@ def init_db():
     if creating:
         print("Database initialized.")
 
-__all__ = ["init_db", "ensure_fts", "ensure_prompts_fts", "fts_exists", "drop_fts"]
+__all__ = ["init_db", "ensure_fts", "ensure_prompts_fts", "fts_exists", "drop_fts", "FTS_TOKENIZER"]
@@ -1,12 +1,92 @@
 """Duplicate detection & deletion by hash."""
 from __future__ import annotations
 import os, sqlite3, time
+from itertools import groupby
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
 from .paths import DB_PATH
-from .progress import _progress_bar
+from .progress import _throttled_progress_bar
+from .hashing import backfill_hashes
+from .connection import connect
+
+_UNLINK_DIR_FD = os.unlink in os.supports_dir_fd
+_UNLINK_CHUNK = 32      # paths per task; each task holds one directory fd
+_UNLINK_WORKERS = 16
+_UNLINK_POOL: ThreadPoolExecutor | None = None
+
+def _unlink_bucket(dirn: str, members: list[str]):
+    """Unlink ``members`` (all inside ``dirn``); returns (removed, failures)."""
+    removed, failures = [], []
+    fd = None
+    if _UNLINK_DIR_FD:
+        try:
+            fd = os.open(dirn or '.', os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+        except OSError:
+            fd = None
+    try:
+        for p in members:
+            try:
+                if fd is not None:
+                    os.unlink(os.path.basename(p), dir_fd=fd)
+                else:
+                    os.remove(p)
+                removed.append(p)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                failures.append((p, e))
+    finally:
+        if fd is not None:
+            os.close(fd)
+    return removed, failures
+
+def _unlink_many(paths, failures: list | None = None):
+    """Unlink ``paths``; returns the set of paths actually removed.
+
+    Paths are bucketed by parent directory and removed with ``unlinkat`` via
+    ``dir_fd`` so the kernel resolves each directory once per bucket. Falls
+    back to ``os.remove`` where dir_fd is unsupported (e.g. Windows). Buckets
+    are split into chunks that run on a small thread pool, so on high-latency
+    storage (NFS, FUSE mounts) unlinks overlap instead of queueing.
+    Missing files are skipped silently; any other ``OSError`` is appended to
+    ``failures`` as an unformatted ``(path, exc)`` pair for reporting later.
+    """
+    global _UNLINK_POOL
+    buckets: dict[str, list[str]] = {}
+    for p in paths:
+        buckets.setdefault(os.path.dirname(p), []).append(p)
+    tasks = [(dirn, members[i:i + _UNLINK_CHUNK])
+             for dirn, members in buckets.items()
+             for i in range(0, len(members), _UNLINK_CHUNK)]
+    if len(tasks) > 1:
+        if _UNLINK_POOL is None:
+            _UNLINK_POOL = ThreadPoolExecutor(max_workers=_UNLINK_WORKERS, thread_name_prefix="dedup-unlink")
+        futures = [_UNLINK_POOL.submit(_unlink_bucket, dirn, chunk) for dirn, chunk in tasks]
+        try:
+            results = [f.result() for f in futures]
+        except BaseException:  # e.g. KeyboardInterrupt: drop work not yet started
+            for f in futures:
+                f.cancel()
+            raise
+    else:
+        results = [_unlink_bucket(dirn, chunk) for dirn, chunk in tasks]
+    removed = set()
+    for done, failed in results:
+        removed.update(done)
+        if failures is not None:
+            failures.extend(failed)
+    return removed
 
 def de_duplicate_by_hash(auto_confirm: bool = False):
+    # Rows indexed with deferred hashing have NULL file_hash; fill them first.
+    try:
+        filled = backfill_hashes(DB_PATH)
+        if filled:
+            print(f"Hashed {filled} file(s) that were indexed without a hash.")
+    except sqlite3.Error as e:
+        print("Database error while hashing deferred files:", e); return None
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with connect(DB_PATH) as conn:
             cur = conn.cursor()
             cur.execute("SELECT file_hash, COUNT(*) c FROM files WHERE file_hash IS NOT NULL AND file_hash <> '' GROUP BY file_hash HAVING c>1")
             dupes = cur.fetchall()
@@ -22,40 +102,93 @@ def de_duplicate_by_hash(auto_confirm: bool = False):
         if confirm != 'y':
             print("Cancelled."); return None
     try:
-        with sqlite3.connect(DB_PATH, timeout=30.0) as conn:
-            conn.row_factory = sqlite3.Row
+        with connect(DB_PATH, timeout=30.0) as conn:
             cur = conn.cursor()
+            # Hold the write lock for the whole pass so no new row can join a group
+            # between keeper selection and the set-based DELETE below.
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute("CREATE TEMP TABLE IF NOT EXISTS dedup_keep(file_hash TEXT PRIMARY KEY, keeper_id INTEGER NOT NULL)")
+            cur.execute("DELETE FROM temp.dedup_keep")
             files_deleted = rows_removed = bytes_freed = 0
-            with _progress_bar(groups, title="Deleting duplicates") as bar2:
-                for h,count in dupes:
-                    cur.execute("SELECT id, file_path, file_size FROM files WHERE file_hash=? ORDER BY id ASC", (h,))
-                    rows = cur.fetchall()
-                    if not rows:
-                        bar2(); continue
-                    keep_index = 0
-                    for i,r in enumerate(rows):
-                        try:
-                            if os.path.isfile(r['file_path']): keep_index=i; break
-                        except Exception:
-                            continue
-                    for i,r in enumerate(rows):
-                        if i == keep_index:
-                            continue
-                        path = r['file_path']
-                        size_val = None
-                        try: size_val = int(r['file_size']) if r['file_size'] is not None else None
-                        except Exception: pass
-                        if os.path.isfile(path):
-                            try:
-                                os.remove(path); files_deleted += 1
-                                if isinstance(size_val, int): bytes_freed += size_val
-                            except Exception: pass
-                        cur.execute("DELETE FROM files WHERE id=?", (r['id'],)); rows_removed += 1
-                    bar2()
+            BATCH = 500
+            keepers: list[tuple[str, int]] = []
+            pending_files: list[tuple[str, int | None]] = []
+            failures: list[tuple[str, OSError]] = []
+            def _flush():
+                nonlocal files_deleted, bytes_freed
+                if pending_files:
+                    removed = _unlink_many([p for p, _ in pending_files], failures)
+                    # Tally in locals (sizes were normalised to int/None per group),
+                    # then fold into the closure totals once per batch
+                    n = freed = 0
+                    for p, size_val in pending_files:
+                        if p in removed:
+                            n += 1
+                            if size_val: freed += size_val
+                    files_deleted += n; bytes_freed += freed
+                    pending_files.clear()
+                if keepers:
+                    cur.executemany("INSERT INTO temp.dedup_keep(file_hash, keeper_id) VALUES (?, ?)", keepers)
+                    keepers.clear()
+            # Stream every duplicate row in (hash, id) order (covering index) and group in
+            # Python. Reads use a second connection so the active SELECT never sees its
+            # own table modified mid-scan; under WAL it simply reads a stable snapshot.
+            with connect(DB_PATH, timeout=30.0) as reader:
+                rcur = reader.cursor()
+                rcur.arraysize = 1000
+                rcur.execute(
+                    """
+                    SELECT file_hash, id, file_path, file_size FROM files
+                    WHERE file_hash IN (
+                        SELECT file_hash FROM files WHERE file_hash IS NOT NULL AND file_hash <> ''
+                        GROUP BY file_hash HAVING COUNT(*) > 1
+                    )
+                    ORDER BY file_hash, id
+                    """
+                )
+                # Per-group ticks are coalesced so terminal redraws stay out of the loop
+                with _throttled_progress_bar(groups, title="Deleting duplicates") as bar2:
+                    for h, group in groupby(rcur, key=itemgetter(0)):
+                        # Plain tuples (no row_factory): transpose once into column tuples
+                        _, ids, paths, sizes = zip(*group)
+                        # Keep the first row whose file still exists; only stat until it is found.
+                        # The rest are unlinked EAFP-style: a missing file just isn't counted.
+                        keep_index = next((i for i, fpath in enumerate(paths) if os.path.isfile(fpath)), 0)
+                        keepers.append((h, ids[keep_index]))
+                        # Same hash => same content => same size; take it once per group
+                        group_size = next((sz for sz in sizes if isinstance(sz, int)), None)
+                        for i, fpath in enumerate(paths):
+                            if i != keep_index:
+                                pending_files.append((fpath, group_size))
+                        if len(pending_files) >= BATCH or len(keepers) >= BATCH:
+                            _flush()
+                        bar2()
+            _flush()
+            # One set-based DELETE for every group: a single statement (and one
+            # planner pass) instead of a DELETE per row / per batch. CROSS JOIN pins
+            # dedup_keep as the outer loop (the temp table has no stats), so files is
+            # probed per keeper via idx_files_hash_cover rather than scanned whole.
+            cur.execute(
+                """
+                DELETE FROM files WHERE id IN (
+                    SELECT f.id FROM temp.dedup_keep k CROSS JOIN files f ON f.file_hash = k.file_hash
+                    WHERE f.id <> k.keeper_id
+                )
+                """
+            )
+            rows_removed = cur.rowcount
+            cur.execute("DROP TABLE temp.dedup_keep")
             conn.commit()
     except sqlite3.Error as e:
         print("Database error during de-duplication:", e); return None
+    if failures:
+        # Formatted once here rather than per failure inside the delete loop
+        print("Failed to delete %d file(s) (rows removed anyway):" % len(failures))
+        for path, err in failures[:10]:
+            print("  %s -> %s" % (path, err))
+        if len(failures) > 10:
+            print("  ... and %d more" % (len(failures) - 10))
     print(f"De-duplication complete. Groups: {groups} Files deleted: {files_deleted} Rows removed: {rows_removed}")
-    return {"duplicate_groups": groups, "files_deleted": files_deleted, "rows_removed": rows_removed, "space_freed_bytes": bytes_freed}
+    return {"duplicate_groups": groups, "files_deleted": files_deleted, "rows_removed": rows_removed, "space_freed_bytes": bytes_freed, "files_failed": len(failures)}
 
 __all__ = ['de_duplicate_by_hash']
@@ -15,6 +15,21 @@ from __future__ import annotations
 
 import json, re, sqlite3, hashlib, time
 from typing import Any, Dict, List, Optional, Tuple
+try:  # optional: C JSON parser (~2.5x faster on typical metadata blobs)
+    import orjson as _orjson
+except ImportError:  # pragma: no cover - optional dependency
+    _orjson = None
+
+
+def _json_loads(text: str) -> Any:
+    """Parse with orjson when installed; stdlib json still covers what orjson
+    rejects (NaN/Infinity literals, integers beyond 64 bits)."""
+    if _orjson is not None:
+        try:
+            return _orjson.loads(text)
+        except _orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
 
 # --- Regex patterns -------------------------------------------------------
 NEG_HEADER = re.compile(r'^Negative prompt:\s*(.*)$', re.I)
@@ -206,7 +221,7 @@ def _derive_raw_text(metadata_json: str) -> Optional[str]:
     text = metadata_json.strip()
     if not text: return None
     if text.startswith('{') and text.endswith('}'):
-        try: obj = json.loads(text)
+        try: obj = _json_loads(text)
         except Exception: return text
         cand = _find_candidate_prompt_string(obj)
         return cand or text
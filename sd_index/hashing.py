@@ -0,0 +1,94 @@
+"""Content hashing helpers (used for de-duplication and cache busting).
+
+Indexing can defer hashing (SD_INDEX_DEFER_HASH=1); rows are then stored with
+``file_hash`` NULL and filled in by ``backfill_hashes`` before de-duplication.
+"""
+from __future__ import annotations
+import os, sqlite3, hashlib
+from concurrent.futures import ThreadPoolExecutor
+from .paths import DB_PATH
+from .progress import _progress_bar
+from .connection import connect
+
+def _blake3_factory():
+    """Return a BLAKE3 hasher constructor when requested and installed, else None.
+
+    Opt-in via SD_INDEX_HASH=blake3 so existing SHA-256 libraries keep grouping
+    duplicates consistently; BLAKE3 digests are stored with a ``b3:`` prefix.
+    """
+    if os.getenv("SD_INDEX_HASH", "sha256").strip().lower() != "blake3":
+        return None
+    try:
+        from blake3 import blake3  # type: ignore
+        return blake3
+    except Exception:  # pragma: no cover - optional dependency
+        return None
+
+_BLAKE3 = _blake3_factory()
+_FILE_DIGEST = getattr(hashlib, 'file_digest', None)  # Python 3.11+
+
+def hash_file(fpath: str) -> str:
+    if _BLAKE3 is not None:
+        hasher = _BLAKE3(max_threads=_BLAKE3.AUTO)
+        try:
+            hasher.update_mmap(fpath)
+        except (AttributeError, OSError, ValueError):
+            hasher = _BLAKE3()
+            with open(fpath, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''): hasher.update(chunk)
+        return "b3:" + hasher.hexdigest()
+    with open(fpath, 'rb') as f:
+        if _FILE_DIGEST is not None:
+            # readinto() a reused buffer, GIL released per block (OpenSSL SHA-NI where present)
+            return _FILE_DIGEST(f, 'sha256').hexdigest()
+        hasher = hashlib.sha256()
+        for chunk in iter(lambda: f.read(1 << 20), b''): hasher.update(chunk)
+    return hasher.hexdigest()
+
+def _hash_or_none(fpath: str):
+    try:
+        return hash_file(fpath)
+    except OSError:
+        return None
+
+def backfill_hashes(db_path: str | None = None, *, workers: int | None = None) -> int:
+    """Hash rows whose ``file_hash`` is NULL; returns the number of rows filled.
+
+    Files are read in a thread pool (hashlib/blake3 release the GIL); rows whose
+    file cannot be read keep NULL so a later run can retry them. Each batch is
+    committed on its own, so other writers only ever wait for one batch.
+    """
+    db_path = db_path or DB_PATH
+    with connect(db_path, timeout=30.0) as conn:
+        cur = conn.cursor()
+        try:
+            rows = cur.execute("SELECT id, file_path FROM files WHERE file_hash IS NULL").fetchall()
+        except sqlite3.Error:
+            return 0
+        if not rows:
+            return 0
+        filled = 0
+        BATCH = 1000
+        workers = workers or min(8, (os.cpu_count() or 1) + 4)
+        with ThreadPoolExecutor(max_workers=workers) as pool, _progress_bar(len(rows), title="Hashing files") as bar:
+            for i in range(0, len(rows), BATCH):
+                chunk = rows[i:i + BATCH]
+                digests = pool.map(_hash_or_none, [r[1] for r in chunk])
+                updates = []
+                for (fid, _), digest in zip(chunk, digests):
+                    if digest is not None:
+                        updates.append((digest, fid))
+                bar(len(chunk))
+                if updates:
+                    # One short write transaction per batch: the write lock is never
+                    # held while files are read, and finished batches survive a later failure
+                    cur.execute("BEGIN IMMEDIATE")
+                    try:
+                        cur.executemany("UPDATE files SET file_hash=? WHERE id=?", updates)
+                        conn.commit()
+                    except sqlite3.Error:
+                        conn.rollback(); raise
+                    filled += len(updates)
+    return filled
+
+__all__ = ['hash_file', 'backfill_hashes']
@@ -1,12 +1,28 @@
 """File indexing logic (migrated from monolithic manager)."""
 from __future__ import annotations
-import os, sqlite3, hashlib, json, datetime, time
+import os, sqlite3, json, datetime, time
 from .paths import DB_PATH, FTS_REBUILDING_FLAG
 from .extraction import extract_models
 from .db_schema import ensure_fts, drop_fts, fts_exists
 from .db_repair import check_and_repair_db
-from .scanning import serialize_obj, scan_dir
-from .progress import _progress_bar
+from .scanning import serialize_obj, scan_dir, read_dimensions
+from .progress import _throttled_progress_bar
+from .connection import connect
+from .hashing import hash_file
+
+# Hot statements composed once so every flush hits the same cached prepared statement.
+_SQL_UPSERT_FILES = """
+    INSERT INTO files (file_path, file_hash, metadata_json, last_scanned, file_size, file_mtime, file_ctime, width, height)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(file_path) DO UPDATE SET file_hash=excluded.file_hash, metadata_json=excluded.metadata_json, last_scanned=excluded.last_scanned, file_size=excluded.file_size, file_mtime=excluded.file_mtime, file_ctime=excluded.file_ctime, width=excluded.width, height=excluded.height
+"""
+_SQL_UPDATE_FILES = "UPDATE files SET file_hash=?, metadata_json=?, last_scanned=?, file_size=?, file_mtime=?, file_ctime=?, width=?, height=? WHERE file_path=?"
+
+# Pending rows are written in one short transaction when a batch fills or this
+# many seconds have passed. The write lock is never held while the scan hashes
+# or parses files, so the web UI's writers only wait for a flush, and an
+# interrupted run keeps everything flushed so far.
+FLUSH_INTERVAL_SEC = 5.0
 
 def index_files(import_path: str | None = None, *, full_refresh: bool | None = None, parser_manager=None):
     if import_path is None:
@@ -24,6 +40,9 @@ def index_files(import_path: str | None = None, *, full_refresh: bool | None = N
         print(f"Directory '{import_path}' does not exist.")
         return
     strict_full = os.getenv("SD_INDEX_STRICT_FULL", "0") == "1"
+    # Deferred hashing: rows are stored with file_hash NULL and hashed later by
+    # backfill_hashes() (run automatically before de-duplication).
+    defer_hash = os.getenv("SD_INDEX_DEFER_HASH", "0") == "1"
     if full_refresh:
         if strict_full:
             print("Running FULL refresh (STRICT) mode: hashing all existing files regardless of (mtime,size).")
@@ -46,24 +65,18 @@ def index_files(import_path: str | None = None, *, full_refresh: bool | None = N
     root_norm = os.path.abspath(import_path)
     if not root_norm.endswith(os.sep):
         root_norm += os.sep
-    like_pattern = root_norm + '%'
+    # Half-open range [root/, root0) selects every path under root via the
+    # file_path unique index; LIKE 'root%' is case-insensitive and cannot.
+    # It also stops '_' / '%' in directory names from acting as wildcards.
+    root_upper = root_norm[:-1] + chr(ord(os.sep) + 1)
     seen_paths: set[str] = set()
-    with sqlite3.connect(DB_PATH, timeout=30.0) as conn:
+    with connect(DB_PATH, timeout=30.0, cached_statements=256) as conn:
         cursor = conn.cursor()
-        for pragma in [
-            ("journal_mode", "WAL"),
-            ("synchronous", "NORMAL"),
-            ("busy_timeout", 30000),
-            ("temp_store", "MEMORY"),
-            ("mmap_size", 300000000),
-        ]:
-            try: cursor.execute(f"PRAGMA {pragma[0]} = {pragma[1]};")
-            except sqlite3.Error: pass
         pre_existing_fts = fts_exists(conn)
         if fast_bulk and pre_existing_fts:
             drop_fts(conn)
         existing_path_map: dict[str, str] = {}
-        cursor.execute("SELECT file_path, file_mtime, file_size FROM files WHERE file_path LIKE ?", (like_pattern,))
+        cursor.execute("SELECT file_path, file_mtime, file_size FROM files WHERE file_path >= ? AND file_path < ?", (root_norm, root_upper))
         preloaded_meta = {}
         for row in cursor.fetchall():
             stored_path = row[0]
@@ -71,9 +84,25 @@ def index_files(import_path: str | None = None, *, full_refresh: bool | None = N
             existing_path_map[p_abs] = stored_path
             if full_refresh:
                 preloaded_meta[p_abs] = (row[1], row[2])
+        last_flush = time.monotonic()
+        def _flush():
+            nonlocal last_flush
+            if insert_batch or update_batch:
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    if insert_batch:
+                        cursor.executemany(_SQL_UPSERT_FILES, insert_batch)
+                    if update_batch:
+                        cursor.executemany(_SQL_UPDATE_FILES, update_batch)
+                    conn.commit()
+                except sqlite3.Error:
+                    conn.rollback(); raise
+                # Only a committed batch leaves memory; a failed one is rolled back intact
+                insert_batch.clear(); update_batch.clear()
+            last_flush = time.monotonic()
         try:
-            with _progress_bar(None, title="Indexing images (incremental)") as bar:
-                for fpath in scan_dir(import_path):
+            with _throttled_progress_bar(None, title="Indexing images (incremental)") as bar:
+                for fpath, st in scan_dir(import_path):
                     ext = os.path.splitext(fpath)[1].lower()
                     if ext not in supported_exts:
                         bar(); continue
@@ -82,7 +111,6 @@ def index_files(import_path: str | None = None, *, full_refresh: bool | None = N
                         seen_paths.add(abs_path)
                         if abs_path in existing_path_map and not full_refresh:
                             files_skipped += 1; bar(); continue
-                        st = os.stat(fpath)
                         file_size = st.st_size
                         file_mtime = int(st.st_mtime)
                         file_ctime = int(getattr(st, 'st_ctime', file_mtime))
@@ -92,19 +120,20 @@ def index_files(import_path: str | None = None, *, full_refresh: bool | None = N
                             if prev_m == file_mtime and prev_s == file_size:
                                 files_skipped += 1; bar(); processed_files += 1; continue
                         width = height = None
-                        try:
-                            from PIL import Image
-                            with Image.open(fpath) as im: width, height = im.size
-                        except Exception: pass
+                        dims = read_dimensions(fpath)
+                        if dims is not None:
+                            width, height = dims
+                        else:
+                            try:
+                                from PIL import Image
+                                with Image.open(fpath) as im: width, height = im.size
+                            except Exception: pass
                         prompt_info = None
                         if parser_manager is not None:
                             try: prompt_info = parser_manager.parse(fpath)
                             except Exception: prompt_info = None
                         metadata = json.dumps(serialize_obj(prompt_info)) if prompt_info else ''
-                        hasher = hashlib.sha256()
-                        with open(fpath, 'rb') as f:
-                            for chunk in iter(lambda: f.read(8192), b''): hasher.update(chunk)
-                        file_hash = hasher.hexdigest()
+                        file_hash = None if defer_hash else hash_file(fpath)
                         now = datetime.datetime.utcnow()
                         if abs_path in existing_path_map:
                             stored_path = existing_path_map[abs_path]
@@ -112,16 +141,6 @@ def index_files(import_path: str | None = None, *, full_refresh: bool | None = N
                         else:
                             # Store absolute path to ensure UI can always resolve file regardless of cwd
                             insert_batch.append((abs_path, file_hash, metadata, now, file_size, file_mtime, file_ctime, width, height)); files_new += 1
-                        if len(insert_batch) >= BATCH_SIZE:
-                            cursor.executemany("""
-                                INSERT INTO files (file_path, file_hash, metadata_json, last_scanned, file_size, file_mtime, file_ctime, width, height)
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                                ON CONFLICT(file_path) DO UPDATE SET file_hash=excluded.file_hash, metadata_json=excluded.metadata_json, last_scanned=excluded.last_scanned, file_size=excluded.file_size, file_mtime=excluded.file_mtime, file_ctime=excluded.file_ctime, width=excluded.width, height=excluded.height
-                            """, insert_batch); conn.commit(); insert_batch.clear()
-                        if full_refresh and len(update_batch) >= BATCH_SIZE:
-                            cursor.executemany("""
-                                UPDATE files SET file_hash=?, metadata_json=?, last_scanned=?, file_size=?, file_mtime=?, file_ctime=?, width=?, height=? WHERE file_path=?
-                            """, update_batch); conn.commit(); update_batch.clear()
                         processed_files += 1
                     except sqlite3.DatabaseError as db_err:
                         if 'malformed' in str(db_err).lower():
@@ -131,36 +150,36 @@ def index_files(import_path: str | None = None, *, full_refresh: bool | None = N
                     except Exception:
                         now = datetime.datetime.utcnow()
                         try:
-                            st = os.stat(fpath); file_size = st.st_size; file_mtime = int(st.st_mtime); file_ctime = int(getattr(st,'st_ctime',file_mtime))
+                            file_size = st.st_size; file_mtime = int(st.st_mtime); file_ctime = int(getattr(st,'st_ctime',file_mtime))
                         except Exception:
                             file_size = file_mtime = file_ctime = 0
-                        if cursor.execute("SELECT 1 FROM files WHERE file_path=?", (fpath,)).fetchone():
-                            update_batch.append(('', '', now, file_size, file_mtime, file_ctime, None, None, fpath))
-                        else:
-                            # Use absolute path on fallback path too
-                            insert_batch.append((abs_path, '', '', now, file_size, file_mtime, file_ctime, None, None))
+                        # UPSERT covers both the new and existing row cases without a probe query
+                        err_abs = os.path.abspath(fpath)
+                        insert_batch.append((existing_path_map.get(err_abs, err_abs), '', '', now, file_size, file_mtime, file_ctime, None, None))
+                    # Outside the per-file handlers: a failed flush (e.g. "database is
+                    # locked" after busy_timeout) aborts the run via the handler below
+                    # instead of being reported as one file's error.
+                    if len(insert_batch) >= BATCH_SIZE or len(update_batch) >= BATCH_SIZE \
+                            or time.monotonic() - last_flush >= FLUSH_INTERVAL_SEC:
+                        _flush()
                     bar()
-            if insert_batch:
-                cursor.executemany("""
-                    INSERT INTO files (file_path, file_hash, metadata_json, last_scanned, file_size, file_mtime, file_ctime, width, height)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ON CONFLICT(file_path) DO UPDATE SET file_hash=excluded.file_hash, metadata_json=excluded.metadata_json, last_scanned=excluded.last_scanned, file_size=excluded.file_size, file_mtime=excluded.file_mtime, file_ctime=excluded.file_ctime, width=excluded.width, height=excluded.height
-                """, insert_batch)
-            if update_batch:
-                cursor.executemany("""UPDATE files SET file_hash=?, metadata_json=?, last_scanned=?, file_size=?, file_mtime=?, file_ctime=?, width=?, height=? WHERE file_path=?""", update_batch)
+            _flush()
             delete_list = []
             for db_path_abs, stored_path in existing_path_map.items():
                 if db_path_abs not in seen_paths and not os.path.exists(db_path_abs):
                     delete_list.append(stored_path)
             if delete_list:
+                cursor.execute("BEGIN IMMEDIATE")
                 CHUNK = 1000
                 for i in range(0, len(delete_list), CHUNK):
                     chunk = delete_list[i:i+CHUNK]
                     placeholders = ','.join(['?']*len(chunk))
                     cursor.execute(f"DELETE FROM files WHERE file_path IN ({placeholders})", chunk)
                 files_deleted = len(delete_list)
-            conn.commit()
+                conn.commit()
         except sqlite3.DatabaseError as db_err:
+            try: conn.rollback()
+            except sqlite3.Error: pass
             if 'malformed' in str(db_err).lower():
                 print("Database marked as malformed. Initiating repair cycle...")
                 if check_and_repair_db(): print("Repair completed. Please rerun indexing.")
@@ -180,6 +199,11 @@ def index_files(import_path: str | None = None, *, full_refresh: bool | None = N
                 if os.path.exists(FTS_REBUILDING_FLAG):
                     os.remove(FTS_REBUILDING_FLAG)
             except Exception: pass
+        if files_new or files_updated or files_deleted:
+            # Refresh planner stats so sort/filter indexes are picked; sampling bounds the cost
+            try:
+                cursor.execute("PRAGMA analysis_limit = 400;"); cursor.execute("ANALYZE;")
+            except sqlite3.Error: pass
         try: cursor.execute("PRAGMA journal_mode = WAL;")
         except sqlite3.Error: pass
         try: cursor.execute("PRAGMA wal_checkpoint(TRUNCATE);")
@@ -191,7 +215,7 @@ def index_files(import_path: str | None = None, *, full_refresh: bool | None = N
     # Automatic extraction phase (can disable via SD_DISABLE_EXTRACTION=1)
     if os.getenv('SD_DISABLE_EXTRACTION','0') != '1':
         try:
-            with sqlite3.connect(DB_PATH, timeout=30.0) as conn:
+            with connect(DB_PATH, timeout=30.0) as conn:
                 summary = extract_models(conn)
             print(f"Extraction: processed={summary['processed']} new={summary['new']} updated={summary['updated']} skipped={summary['skipped']}")
         except Exception as e:  # pragma: no cover
@@ -4,6 +4,7 @@ Separated to avoid optional dependency (alive-progress) in core logic imports.
 """
 from __future__ import annotations
 import threading, time
+from contextlib import contextmanager
 
 def _progress_bar(total=None, title: str = ""):
     try:
@@ -12,11 +13,51 @@ def _progress_bar(total=None, title: str = ""):
     except Exception:
         class _NoBar:
             def __enter__(self_inner):
-                return (lambda: None)
+                return (lambda *a, **k: None)
             def __exit__(self_inner, exc_type, exc, tb):
                 return False
         return _NoBar()
 
+class _ThrottledBar:
+    """Coalesce per-item ``bar()`` calls into batched ``bar(n)`` increments.
+
+    Flushes once ``every`` items are pending or ``interval`` seconds elapsed,
+    so redraw work stays off the per-file hot path.
+    """
+    __slots__ = ("_bar", "_pending", "_every", "_interval", "_last")
+
+    def __init__(self, bar, every: int = 256, interval: float = 0.1):
+        self._bar = bar
+        self._pending = 0
+        self._every = every
+        self._interval = interval
+        self._last = time.monotonic()
+
+    def __call__(self, n: int = 1):
+        self._pending += n
+        if self._pending >= self._every:
+            self.flush()
+        else:
+            now = time.monotonic()
+            if now - self._last >= self._interval:
+                self.flush(now)
+
+    def flush(self, now: float | None = None):
+        if self._pending:
+            self._bar(self._pending)
+            self._pending = 0
+        self._last = time.monotonic() if now is None else now
+
+@contextmanager
+def _throttled_progress_bar(total=None, title: str = "", every: int = 256, interval: float = 0.1):
+    """Like ``_progress_bar`` but yields a ``_ThrottledBar``; pending counts flush on exit."""
+    with _progress_bar(total, title=title) as bar:
+        throttled = _ThrottledBar(bar, every=every, interval=interval)
+        try:
+            yield throttled
+        finally:
+            throttled.flush()
+
 def _run_with_spinner(title: str, func, *args, **kwargs):
     """Run a function in a worker thread while showing an alive-progress spinner."""
     result = {}
@@ -43,4 +84,4 @@ def _run_with_spinner(title: str, func, *args, **kwargs):
         raise error['exc']
     return result.get('value')
 
-__all__ = ["_progress_bar", "_run_with_spinner"]
+__all__ = ["_progress_bar", "_throttled_progress_bar", "_run_with_spinner"]
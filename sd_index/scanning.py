@@ -1,21 +1,82 @@
 """Filesystem scanning & serialization helpers."""
 from __future__ import annotations
-import os
+import os, struct, dataclasses
+
+_SCALARS = (str, int, float, bool)
+_SCALAR_TYPES = frozenset((str, int, float, bool, type(None)))
+_MAX_DEPTH = 1000  # mirrors the recursion limit the recursive version hit on cycles
+_UNSEEN = object()
+_FIELD_CACHE: dict[type, tuple[str, ...] | None] = {}
+
+def _public_fields(cls):
+    """Field names whose instance ``__dict__`` is known up front, else None.
+
+    Only plain dataclasses qualify (every field set by the generated
+    ``__init__``, all public, no ``__post_init__``): their ``__dict__`` keys
+    are exactly the fields in declaration order, so ``serialize_obj`` can
+    read them directly instead of filtering ``__dict__`` per instance. A
+    length check at the call site falls back if an instance grew attributes.
+    """
+    if not dataclasses.is_dataclass(cls) or hasattr(cls, "__post_init__"):
+        return None
+    fields = dataclasses.fields(cls)
+    if any(not f.init or f.name.startswith("_") for f in fields):
+        return None
+    return tuple(f.name for f in fields)
 
 def serialize_obj(obj):
-    if isinstance(obj, (str, int, float, bool)) or obj is None:
+    """Convert parser output (dataclasses, lists, dicts) into JSON-ready data.
+
+    Iterative walk with an explicit stack: lists and dicts keep their order,
+    objects contribute their public ``__dict__`` entries and anything else
+    becomes ``str(obj)``. Scalar children are written in place and only
+    containers are pushed. Raises RecursionError on cyclic/over-deep input.
+    """
+    if obj is None or isinstance(obj, _SCALARS):
         return obj
-    elif isinstance(obj, list):
-        return [serialize_obj(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: serialize_obj(value) for key, value in obj.items()}
-    else:
-        if hasattr(obj, "__dict__"):
-            return {key: serialize_obj(value) for key, value in obj.__dict__.items() if not key.startswith("_")}
+    scalar_types = _SCALAR_TYPES
+    field_cache = _FIELD_CACHE
+    root = [None]
+    stack = [(obj, root, 0, 0)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        o, parent, slot, depth = pop()
+        if depth > _MAX_DEPTH:
+            raise RecursionError("serialize_obj: structure too deep (cyclic?)")
+        if isinstance(o, list):
+            out = list(o)
+            for i, item in enumerate(o):
+                if type(item) not in scalar_types and not isinstance(item, _SCALARS):
+                    push((item, out, i, depth + 1))
         else:
-            return str(obj)
+            if isinstance(o, dict):
+                items = o.items()
+            else:
+                d = getattr(o, "__dict__", None)
+                if d is None:
+                    parent[slot] = str(o)
+                    continue
+                cls = type(o)
+                keys = field_cache.get(cls, _UNSEEN)
+                if keys is _UNSEEN:
+                    keys = field_cache[cls] = _public_fields(cls)
+                if keys is not None and len(d) == len(keys):
+                    items = [(k, d[k]) for k in keys]
+                else:
+                    items = [(k, v) for k, v in d.items() if not k.startswith("_")]
+            out = dict(items)
+            for k, v in items:
+                if type(v) not in scalar_types and not isinstance(v, _SCALARS):
+                    push((v, out, k, depth + 1))
+        parent[slot] = out
+    return root[0]
 
 def scan_dir(path):
+    """Yield ``(file_path, stat_result)`` for every regular file under ``path``.
+
+    The stat comes from ``DirEntry.stat()`` which is cached from the directory
+    read on most platforms, so callers avoid a second ``os.stat`` per file.
+    """
     try:
         with os.scandir(path) as it:
             for entry in it:
@@ -23,10 +84,79 @@ def scan_dir(path):
                     if entry.is_dir(follow_symlinks=False):
                         yield from scan_dir(entry.path)
                     elif entry.is_file(follow_symlinks=False):
-                        yield entry.path
+                        yield entry.path, entry.stat(follow_symlinks=False)
                 except (PermissionError, FileNotFoundError, OSError):
                     continue
     except (PermissionError, FileNotFoundError, OSError):
         return
 
-__all__ = ['serialize_obj', 'scan_dir']
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+def _jpeg_dims(f):
+    f.seek(2)
+    while True:
+        b = f.read(1)
+        while b and b != b'\xff':
+            b = f.read(1)
+        while b == b'\xff':
+            b = f.read(1)
+        if not b:
+            return None
+        marker = b[0]
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            continue  # standalone markers carry no length
+        if marker == 0xD9:
+            return None
+        seg = f.read(2)
+        if len(seg) != 2:
+            return None
+        seg_len = struct.unpack('>H', seg)[0]
+        if marker in _JPEG_SOF:
+            data = f.read(5)
+            if len(data) != 5:
+                return None
+            h, w = struct.unpack('>xHH', data)
+            return w, h
+        f.seek(seg_len - 2, 1)
+
+def read_dimensions(path: str):
+    """Return ``(width, height)`` parsed from the file header, or None.
+
+    Handles PNG / JPEG / WebP / BMP without building a PIL image; callers
+    fall back to PIL for anything else (e.g. TIFF) or on a parse failure.
+    The format is sniffed from magic bytes since extensions are often wrong.
+    """
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(32)
+            if head[:8] == b'\x89PNG\r\n\x1a\n':
+                if head[12:16] == b'IHDR':
+                    return struct.unpack('>II', head[16:24])
+            elif head[:2] == b'\xff\xd8':
+                return _jpeg_dims(f)
+            elif head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+                chunk = head[12:16]
+                if chunk == b'VP8 ' and head[23:26] == b'\x9d\x01\x2a':
+                    f.seek(26)
+                    w, h = struct.unpack('<HH', f.read(4))
+                    return w & 0x3FFF, h & 0x3FFF
+                if chunk == b'VP8L' and head[20:21] == b'\x2f':
+                    f.seek(21)
+                    bits = struct.unpack('<I', f.read(4))[0]
+                    return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+                if chunk == b'VP8X':
+                    f.seek(24)
+                    raw = f.read(6)
+                    if len(raw) == 6:
+                        return (int.from_bytes(raw[0:3], 'little') + 1,
+                                int.from_bytes(raw[3:6], 'little') + 1)
+            elif head[:2] == b'BM' and len(head) >= 26:
+                if struct.unpack('<I', head[14:18])[0] == 12:  # OS/2 BITMAPCOREHEADER
+                    return struct.unpack('<HH', head[18:22])
+                w, h = struct.unpack('<ii', head[18:26])
+                return w, abs(h)
+    except (OSError, struct.error):
+        return None
+    return None
+
+__all__ = ['serialize_obj', 'scan_dir', 'read_dimensions']
@@ -5,6 +5,12 @@ import os
 
 from sd_parsers import ParserManager
 from sd_parsers.data import Sampler
+from sd_index.scanning import serialize_obj
+
+try:  # optional: C encoder, several times faster on large metadata trees
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
 
 parser_manager = ParserManager()
 
@@ -26,20 +32,6 @@ def show_sampler(i: int, sampler: Sampler):
 
     print(f"\nSampler Parameters: {sampler.parameters}")
 
-def serialize_obj(obj):
-    if isinstance(obj, (str, int, float, bool)) or obj is None:
-        return obj
-    elif isinstance(obj, list):
-        return [serialize_obj(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: serialize_obj(value) for key, value in obj.items()}
-    else:
-        # For custom objects, convert __dict__ recursively
-        if hasattr(obj, "__dict__"):
-            return {key: serialize_obj(value) for key, value in obj.__dict__.items() if not key.startswith("_")}
-        else:
-            return str(obj)
-
 def main():
     import_path = input("Enter the path to an image file: ").strip()
     if not os.path.isfile(import_path):
@@ -60,8 +52,12 @@ def main():
 
             if metadata_obj:
                 json_path = os.path.splitext(import_path)[0] + ".json"
-                with open(json_path, "w", encoding="utf-8") as f:
-                    json.dump(metadata_obj, f, indent=2, ensure_ascii=False)
+                if orjson is not None:
+                    with open(json_path, "wb") as f:
+                        f.write(orjson.dumps(metadata_obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+                else:
+                    with open(json_path, "w", encoding="utf-8") as f:
+                        json.dump(metadata_obj, f, indent=2, ensure_ascii=False)
                 print(f"Full JSON metadata saved to: {json_path}")
 
                 # Save JSON keys to a .txt file
@@ -1,4 +1,6 @@
 import os
+import json
+import hashlib
 import shutil
 import sqlite3
 import time
@@ -17,8 +19,18 @@ PROD_DB_PATH = BASE_DIR / 'sd_index.db'
 BACKUP_PATH = BASE_DIR / 'backup_sd_index.db'
 
 # Always use an isolated test database (removes need for rename juggling).
-TEST_DB_PATH = BASE_DIR / 'test_sd_index.db'
+# PYTEST_IN_MEMORY=1 keeps it on tmpfs (/dev/shm) where available: still a real
+# file (init/clear/snapshot paths are unchanged) but no I/O reaches the disk.
+_SHM_DIR = Path('/dev/shm')
+if os.getenv('PYTEST_IN_MEMORY') == '1' and _SHM_DIR.is_dir() and os.access(_SHM_DIR, os.W_OK):
+    TEST_DB_PATH = _SHM_DIR / f'test_sd_index_{os.getpid()}.db'
+else:
+    TEST_DB_PATH = BASE_DIR / 'test_sd_index.db'
+# The test DB is throwaway: skip fsyncs on every sd_index connection.
+os.environ.setdefault('SD_SQLITE_SYNCHRONOUS', 'OFF')
 os.environ['SD_DB_PATH'] = str(TEST_DB_PATH)
+TEST_THUMB_CACHE = TEST_DB_PATH.parent / f'test_thumb_cache_{os.getpid()}'
+os.environ['SD_THUMB_CACHE_DIR'] = str(TEST_THUMB_CACHE)
 DB_PATH = TEST_DB_PATH  # compatibility name for rest of this file
 TEST_IMG_ENV = os.getenv('TEST_IMAGE_DIR')
 TEST_IMAGES_DIR = Path(TEST_IMG_ENV) if TEST_IMG_ENV else (BASE_DIR / 'test_images')
@@ -48,6 +60,7 @@ def isolated_test_db():
         if p.exists():
             try: p.unlink()
             except Exception: pass
+    shutil.rmtree(TEST_THUMB_CACHE, ignore_errors=True)
 
 @pytest.fixture(scope='session')
 def perf_log():
@@ -56,44 +69,94 @@ def perf_log():
         f.write(f"\n=== RUN {dt.datetime.utcnow().isoformat()}Z ===\n")
     return PERF_LOG
 
+# Minimal 1x1 RGB PNG used when no image corpus is available.
+_PNG_STUB = (b"\x89PNG\r\n\x1a\n"  # header
+             b"\x00\x00\x00\rIHDR"  # IHDR chunk
+             b"\x00\x00\x00\x01\x00\x00\x00\x01\x08\x02\x00\x00\x00"  # 1x1 RGB
+             b"\x90wS\xDE"  # CRC
+             b"\x00\x00\x00\x0AIDAT\x08\xD7c``\x00\x00\x00\x04\x00\x01"  # IDAT
+             b"\x0D\x0A\x2D\xB4"  # CRC
+             b"\x00\x00\x00\x00IEND\xAE\x42\x60\x82")
+
+def _link_corpus(src_dir, work_dir: Path) -> None:
+    """Hard-link every regular file of ``src_dir`` into ``work_dir`` (copy across devices)."""
+    with os.scandir(src_dir) as it:
+        for entry in it:
+            if not entry.is_file():
+                continue
+            dst = work_dir / entry.name
+            try:
+                os.link(entry.path, dst)
+            except OSError:
+                try:
+                    shutil.copy2(entry.path, dst)
+                except Exception:
+                    pass
+
+@pytest.fixture(scope='session')
+def _placeholder_corpus(tmp_path_factory):
+    """A few tiny placeholder PNGs, written once per session."""
+    master = tmp_path_factory.mktemp('imgs_master')
+    for i in range(3):
+        (master / f'sample_{i}.png').write_bytes(_PNG_STUB)
+    return master
+
 @pytest.fixture(scope='function')
-def test_image_dir(tmp_path_factory):
+def test_image_dir(request, tmp_path_factory):
     """Provide a per-test image directory to avoid destructive side-effects.
 
-    Copies repository test images if present; otherwise generates a few tiny
-    placeholder PNG files so indexing always has content. This prevents tests
-    that delete or modify files from impacting later tests.
+    Hard-links repository test images if present (falling back to a copy on
+    cross-device temp dirs); otherwise links a few tiny placeholder PNG
+    files so indexing always has content. Deleting, moving or renaming a link
+    never touches the source image; tests that change file metadata or
+    content must detach the file first (see ``detach_hardlink``).
     """
     work_dir = tmp_path_factory.mktemp('imgs')
-    src_files = list(TEST_IMAGES_DIR.glob('*')) if TEST_IMAGES_DIR.exists() else []
-    if src_files:
-        for f in src_files:
-            try:
-                shutil.copy2(f, work_dir / f.name)
-            except Exception:
-                pass
-    # If still empty, synthesize a few minimal PNG files
+    if TEST_IMAGES_DIR.exists():
+        _link_corpus(TEST_IMAGES_DIR, work_dir)
+    # If still empty, fall back to the session's placeholder PNG files
     if not any(work_dir.iterdir()):
-        png_stub = (b"\x89PNG\r\n\x1a\n"  # header
-                    b"\x00\x00\x00\rIHDR"  # IHDR chunk
-                    b"\x00\x00\x00\x01\x00\x00\x00\x01\x08\x02\x00\x00\x00"  # 1x1 RGB
-                    b"\x90wS\xDE"  # CRC
-                    b"\x00\x00\x00\x0AIDAT\x08\xD7c``\x00\x00\x00\x04\x00\x01"  # IDAT
-                    b"\x0D\x0A\x2D\xB4"  # CRC
-                    b"\x00\x00\x00\x00IEND\xAE\x42\x60\x82")
-        for i in range(3):
-            (work_dir / f'sample_{i}.png').write_bytes(png_stub)
+        _link_corpus(request.getfixturevalue('_placeholder_corpus'), work_dir)
     return str(work_dir)
 
+def detach_hardlink(path) -> None:
+    """Replace a hard-linked fixture file with a private copy before mutating it."""
+    path = Path(path)
+    tmp = path.with_name(path.name + '.detach')
+    shutil.copy2(path, tmp)
+    os.replace(tmp, path)
+
+# corpus key -> (snapshot of the freshly built DB, directory it was indexed from)
+_INDEX_CACHE: dict[str, tuple[Path, str]] = {}
+
+def _corpus_key(root) -> str:
+    """Stable key over (name, size, mtime) of every file directly under ``root``."""
+    with os.scandir(root) as it:
+        entries = sorted((e.name, e.stat().st_size, e.stat().st_mtime_ns) for e in it if e.is_file())
+    return hashlib.blake2b(json.dumps(entries).encode(), digest_size=16).hexdigest()
+
+def _restore_index(snapshot: Path, indexed_root: str, root: str, db_path: str) -> None:
+    """Copy a cached index into place and re-point its paths at ``root``."""
+    for p in (Path(db_path+'-wal'), Path(db_path+'-shm')):
+        if p.exists():
+            p.unlink()
+    shutil.copyfile(snapshot, db_path)
+    old = os.path.join(os.path.abspath(indexed_root), '')
+    new = os.path.join(os.path.abspath(root), '')
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('UPDATE files SET file_path = ? || substr(file_path, ?) WHERE substr(file_path, 1, ?) = ?',
+                     (new, len(old) + 1, len(old), old))
+        conn.commit()
+
 @pytest.fixture(scope='function')
-def index_database(test_image_dir, perf_log, monkeypatch):
-    """Build (or rebuild) the test index each test function.
-
-    Removes brittle caching so tests that clear/recreate the DB do not
-    inadvertently leave later tests with an empty database while still
-    returning a cached positive result.
-    The image corpus is small so re-index cost is negligible; if it grows
-    dramatically we can reintroduce a cache with a fresh row-count check.
+def index_database(request, test_image_dir, perf_log, monkeypatch, tmp_path_factory):
+    """Build (or restore) the test index each test function.
+
+    The first test for a given corpus (names, sizes, mtimes) indexes it from
+    scratch and snapshots the DB; later tests copy that snapshot and rewrite
+    the directory prefix instead of re-hashing and re-extracting every file.
+    Each test still gets its own DB, so destructive tests cannot leak state.
+    Mark a test ``mutates_corpus`` to force a real index run.
     """
     start = time.time()
     monkeypatch.setattr('builtins.input', lambda prompt='': test_image_dir)
@@ -103,11 +166,20 @@ def index_database(test_image_dir, perf_log, monkeypatch):
         if p.exists():
             try: p.unlink()
             except Exception: pass
-    sim.init_db()
-    sim.index_files()
+    key = _corpus_key(test_image_dir)
+    cached = None if request.node.get_closest_marker('mutates_corpus') else _INDEX_CACHE.get(key)
+    if cached:
+        _restore_index(cached[0], cached[1], test_image_dir, sim.DB_PATH)
+    else:
+        sim.init_db()
+        sim.index_files()
+        snapshot = tmp_path_factory.mktemp('index_cache') / 'index.db'
+        with sqlite3.connect(sim.DB_PATH) as src, sqlite3.connect(snapshot) as dst:
+            src.backup(dst)
+        _INDEX_CACHE[key] = (snapshot, test_image_dir)
     duration = time.time() - start
     with open(perf_log, 'a', encoding='utf-8') as f:
-        f.write(f"index_time_sec={duration:.3f}\n")
+        f.write(f"index_time_sec={duration:.3f}{' (cached)' if cached else ''}\n")
     with sqlite3.connect(sim.DB_PATH) as conn:
         cur = conn.cursor(); cur.execute('SELECT COUNT(*) FROM files')
         count = cur.fetchone()[0]
@@ -115,11 +187,20 @@ def index_database(test_image_dir, perf_log, monkeypatch):
     assert count > 0, 'Expected at least one indexed file (fixture guarantees placeholder creation)'
     return {'count': count, 'duration': duration}
 
-@pytest.fixture(scope='function')
-def test_client(index_database):  # ensure DB built first
+@pytest.fixture(scope='session')
+def _session_client():
+    """One TestClient (and app startup) shared by every webui test."""
     from fastapi.testclient import TestClient
     from webui.main import app
-    return TestClient(app)
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture(scope='function')
+def test_client(index_database, _session_client):  # ensure DB built first
+    # The DB was just rebuilt underneath the shared app; drop its cached counts.
+    import webui.main as wm
+    wm._invalidate_count_cache()
+    return _session_client
 
 def pytest_configure(config):
     config.addinivalue_line('markers', 'integration: integration test suite')
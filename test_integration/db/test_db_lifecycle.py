@@ -1,6 +1,7 @@
 import sqlite3, time, shutil, os, pytest
 from pathlib import Path
 import sd_index_manager as sim
+from conftest import detach_hardlink
 
 @pytest.mark.integration
 @pytest.mark.db
@@ -11,6 +12,7 @@ def test_index_fast_then_full_refresh_updates_stats(monkeypatch, test_image_dir)
     assert fast_stats['mode'] == 'FAST'
     # touch a file to ensure full refresh path executes
     first = next(Path(test_image_dir).glob('*'))
+    detach_hardlink(first)  # fixture files are hard links to test_images/
     new_time = time.time() + 5
     os.utime(first, (new_time, new_time))
     full_stats = sim.index_files(test_image_dir, full_refresh=True)
@@ -73,3 +75,52 @@ def test_deduplicate_by_hash_cancel(monkeypatch, tmp_path):
     monkeypatch.setattr('builtins.input', lambda *_: 'n')
     res = sim.de_duplicate_by_hash(auto_confirm=False)
     assert res is None
+
+@pytest.mark.integration
+@pytest.mark.db
+def test_deferred_hash_backfilled_before_dedupe(monkeypatch, tmp_path):
+    test_dir = tmp_path / 'deferred'; test_dir.mkdir()
+    content = b'deferred dupe'
+    (test_dir / 'a.png').write_bytes(content); (test_dir / 'b.png').write_bytes(content)
+    sim.clear_database(); sim.init_db()
+    monkeypatch.setenv('SD_INDEX_DEFER_HASH', '1')
+    sim.index_files(str(test_dir), full_refresh=False)
+    with sqlite3.connect(sim.DB_PATH) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM files WHERE file_hash IS NULL').fetchone()[0] == 2
+    summary = sim.de_duplicate_by_hash(auto_confirm=True)
+    assert summary and summary['duplicate_groups'] == 1 and summary['rows_removed'] == 1
+    assert summary['files_deleted'] == 1 and len(list(test_dir.iterdir())) == 1
+
+@pytest.mark.integration
+@pytest.mark.db
+def test_backup_db_copies_rows_in_steps(tmp_path):
+    from sd_index import backup_db
+    db_path = tmp_path / 'src.db'
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('create table t(a)')
+        conn.executemany('insert into t(a) values (?)', [(i,) for i in range(500)])
+        conn.commit()
+    steps = []
+    dest = backup_db(str(db_path), str(tmp_path / 'dst.db'), pages=1, progress=lambda st, rem, tot: steps.append(rem))
+    assert dest and len(steps) > 1
+    with sqlite3.connect(dest) as conn:
+        assert conn.execute('select count(*) from t').fetchone()[0] == 500
+
+@pytest.mark.integration
+@pytest.mark.db
+def test_failed_index_flush_aborts_run_and_rolls_back(monkeypatch, tmp_path, capsys):
+    import sd_index.indexing as ix
+    test_dir = tmp_path / 'flush'; test_dir.mkdir()
+    old = test_dir / 'old.png'; old.write_bytes(b'old')
+    sim.clear_database(); sim.init_db(); sim.index_files(str(test_dir), full_refresh=False)
+    os.utime(old, (time.time() + 5, time.time() + 5))
+    (test_dir / 'new.png').write_bytes(b'new')
+    # The update half of the flush fails after the insert half already ran
+    monkeypatch.setattr(ix, '_SQL_UPDATE_FILES', 'UPDATE no_such_table SET x = ?')
+    monkeypatch.setattr(ix, 'FLUSH_INTERVAL_SEC', 0.0)  # flush inside the scan loop
+    capsys.readouterr()
+    assert sim.index_files(str(test_dir), full_refresh=True) is None
+    out = capsys.readouterr().out
+    assert 'SQLite error aborted indexing' in out and 'SQLite error for file' not in out
+    with sqlite3.connect(sim.DB_PATH) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM files').fetchone()[0] == 1  # insert rolled back with it
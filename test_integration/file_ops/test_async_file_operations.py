@@ -35,7 +35,7 @@ def test_async_file_operation_query_scope(test_client: TestClient, tmp_path):
         if js['status'] in ('completed','failed'): break
         time.sleep(0.05)
     assert js['status'] == 'completed'
-    assert js['counts']['copied'] <= (len(ids) - len(excluded))
+    assert js['counts']['copied'] == len(ids) - len(excluded) == js['processed']
 
 @pytest.mark.integration
 @pytest.mark.fileops
@@ -47,8 +47,39 @@ def test_matching_ids_truncation_simulated(monkeypatch, test_client: TestClient)
         def __exit__(self, *a): pass
         def cursor(self): return self
         def execute(self, *a, **k): return self
-        def fetchall(self): return [{'id': i} for i in range(105000)]
+        def fetchall(self): return [(i,) for i in range(105000)]
     monkeypatch.setattr(wm, 'get_db_connection', lambda: FakeConn())
     resp = test_client.get('/matching_ids')
     data = resp.json(); assert data['truncated'] is True and len(data['ids']) == 100000
     monkeypatch.setattr(wm, 'get_db_connection', orig)
+
+@pytest.mark.integration
+@pytest.mark.fileops
+def test_async_move_updates_rows_in_batch(test_client: TestClient, tmp_path):
+    import sqlite3, os
+    import sd_index_manager as sim
+    ids = test_client.get('/matching_ids').json()['ids'][:3]
+    if not ids:
+        pytest.skip('No IDs available for async move test')
+    dest = tmp_path / 'async_move'; dest.mkdir()
+    job_id = test_client.post('/file_operation_async', json={"operation": "move", "scope": {"type": "ids", "ids": ids}, "destination": str(dest)}).json()['job_id']
+    for _ in range(60):
+        status = test_client.get(f'/file_operation_status/{job_id}').json()
+        if status['status'] in ('completed', 'failed'): break
+        time.sleep(0.1)
+    assert status['status'] == 'completed' and status['counts']['moved'] == len(ids) and status['processed'] == len(ids)
+    with sqlite3.connect(sim.DB_PATH) as conn:
+        paths = [r[0] for r in conn.execute(f"SELECT file_path FROM files WHERE id IN ({','.join('?' * len(ids))})", ids)]
+    assert len(paths) == len(ids) and all(os.path.dirname(p) == str(dest) and os.path.isfile(p) for p in paths)
+
+@pytest.mark.integration
+@pytest.mark.fileops
+def test_prune_jobs_keeps_running_and_bounds_finished(monkeypatch):
+    from collections import OrderedDict
+    import webui.main as wm
+    monkeypatch.setattr(wm, 'MAX_JOBS', 3)
+    now = time.time()
+    jobs = OrderedDict((f'j{i}', {'status': s, 'updated': now}) for i, s in enumerate(['running', 'completed', 'failed', 'completed']))
+    jobs['old'] = {'status': 'completed', 'updated': now - wm.JOB_RETENTION_SEC - 1}
+    wm._prune_jobs(jobs, now)
+    assert list(jobs) == ['j0', 'j3']
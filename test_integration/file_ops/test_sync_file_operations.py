@@ -25,6 +25,12 @@ def test_copy_then_delete_round_trip(tmp_path, test_client: TestClient, perf_log
     new_paths = list(post_paths - pre_paths)
     assert len(new_paths) == len(ids)
     new_path_set = set(new_paths)
+    with sqlite3.connect(sim.DB_PATH) as conn:
+        # Copied rows carry the source row's hash, metadata and stats
+        cols = 'file_hash, metadata_json, file_size, width, height'
+        src_rows = {tuple(r) for r in conn.execute(f'SELECT {cols} FROM files WHERE id IN ({",".join("?" * len(ids))})', ids)}
+        copy_rows = {tuple(r) for r in conn.execute(f'SELECT {cols} FROM files WHERE file_path IN ({",".join("?" * len(new_paths))})', new_paths)}
+    assert copy_rows == src_rows
     delete_ids = [i for i, p in post_rows if p in new_path_set]
     assert len(delete_ids) == len(ids)
     resp_del = test_client.post('/file_operation', json={'operation':'delete','ids':delete_ids})
@@ -34,3 +40,67 @@ def test_copy_then_delete_round_trip(tmp_path, test_client: TestClient, perf_log
     assert post_count == pre_count
     with open(perf_log, 'a', encoding='utf-8') as f:
         f.write(f'file_ops_time_ms={(time.time()-t0)*1000:.2f}\n')
+
+@pytest.mark.integration
+@pytest.mark.fileops
+def test_fs_ops_reserve_unique_targets_in_batch(tmp_path):
+    import webui.main as wm
+    src_dirs = [tmp_path / f's{i}' for i in range(3)]
+    dest = tmp_path / 'dest'; dest.mkdir()
+    planned, taken = [], set()
+    for i, d in enumerate(src_dirs):
+        d.mkdir(); f = d / 'same.png'; f.write_bytes(b'x%d' % i)
+        planned.append((None, str(f), wm._safe_collision_path(str(dest), 'same.png', taken)))
+    assert len({t for _, _, t in planned}) == 3
+    assert wm._run_fs_ops('copy', planned) == [None, None, None]
+    assert sorted(p.name for p in dest.iterdir()) == ['same.png', 'same_1.png', 'same_2.png']
+    assert wm._safe_collision_path(str(dest), 'same.png', wm._dir_names(str(dest))) == str(dest / 'same_3.png')
+    errs = wm._run_fs_ops('move', [(None, str(tmp_path / 'missing.png'), str(dest / 'm.png'))] * 2)
+    assert all(isinstance(e, OSError) for e in errs)
+    # Targets are claimed on disk (O_EXCL), so planners without a shared set never collide
+    first, second = wm._safe_collision_path(str(dest), 'new.png'), wm._safe_collision_path(str(dest), 'new.png')
+    assert (first, second) == (str(dest / 'new.png'), str(dest / 'new_1.png')) and (dest / 'new.png').stat().st_size == 0
+    # A failed move drops its placeholder instead of leaving an empty file behind
+    assert isinstance(wm._run_fs_ops('move', [(None, str(tmp_path / 'missing.png'), second)])[0], OSError)
+    assert not (dest / 'new_1.png').exists()
+    # Deleting a path that is no longer a regular file skips it (row still removed)
+    (tmp_path / 'now_a_dir.png').mkdir()
+    assert wm._run_fs_ops('delete', [(None, str(tmp_path / 'now_a_dir.png'), None)]) == [None]
+    assert (tmp_path / 'now_a_dir.png').is_dir()
+
+@pytest.mark.integration
+@pytest.mark.fileops
+def test_copy_file_keeps_bytes_and_times(tmp_path, monkeypatch):
+    import os, errno
+    import webui.main as wm
+    src = tmp_path / 'src.png'; src.write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+    os.utime(src, (1_600_000_000, 1_600_000_000))
+    dst = tmp_path / 'dst.png'; dst.write_bytes(b'')  # reserved placeholder
+    wm._copy_file(str(src), str(dst))
+    assert dst.read_bytes() == src.read_bytes() and int(dst.stat().st_mtime) == 1_600_000_000
+    # Filesystems that refuse copy_file_range fall back to a user-space copy
+    def refuse(*a, **k):
+        raise OSError(errno.EXDEV, 'cross-device')
+    monkeypatch.setattr(wm, '_COPY_FILE_RANGE', refuse)
+    wm._copy_file(str(src), str(tmp_path / 'dst2.png'))
+    assert (tmp_path / 'dst2.png').read_bytes() == src.read_bytes()
+
+@pytest.mark.integration
+@pytest.mark.fileops
+def test_validate_allowed_rejects_dotdot_escape(tmp_path, monkeypatch):
+    import os
+    import webui.main as wm
+    root = wm._canonical_path(str(tmp_path / 'root'))
+    monkeypatch.setattr(wm, 'ALLOWED_ROOTS', [root])
+    monkeypatch.setattr(wm, '_ALLOWED_ROOT_SET', frozenset([root]))
+    monkeypatch.setattr(wm, '_ALLOWED_ROOT_PREFIXES', (root + os.sep,))
+    wm._dir_allowed.cache_clear()
+    try:
+        assert wm._validate_allowed(os.path.join(root, 'sub', 'a.png'))
+        assert wm._validate_allowed(root)
+        # The raw dirname of '<root>/..' is '<root>', but the canonical path is its parent
+        assert not wm._validate_allowed(os.path.join(root, '..'))
+        assert not wm._validate_allowed(os.path.join(root, '..', 'etc', 'x'))
+        assert not wm._validate_allowed(os.path.join(root, 'sub', '..', '..', 'x.png'))
+    finally:
+        wm._dir_allowed.cache_clear()
@@ -40,3 +40,36 @@ def test_refresh_fts_endpoint(index_database):
     client = TestClient(app)
     resp = client.post('/refresh_fts')
     assert resp.status_code == 200 and 'has_fts' in resp.json()
+
+@pytest.mark.integration
+@pytest.mark.fts
+def test_fts_trigram_substring_match(index_database):
+    from sd_index.db_schema import FTS_TOKENIZER
+    if FTS_TOKENIZER != 'trigram':
+        pytest.skip('SQLite build lacks the trigram tokenizer')
+    with sqlite3.connect(sim.DB_PATH) as conn:
+        ddl = conn.execute("SELECT sql FROM sqlite_master WHERE name='files_fts'").fetchone()[0]
+        assert "tokenize='trigram'" in ddl
+        path = conn.execute('SELECT file_path FROM files LIMIT 1').fetchone()[0]
+        stem = path.rsplit('/', 1)[-1].split('.')[0]
+        fragment = stem[1:5]  # mid-token substring, unreachable by unicode61 prefix search
+        hits = conn.execute('SELECT COUNT(*) FROM files_fts WHERE files_fts MATCH ?', (f'"{fragment}"',)).fetchone()[0]
+        assert hits >= 1
+
+@pytest.mark.integration
+@pytest.mark.fts
+def test_trigram_probe_not_stuck_while_fts_dropped(index_database):
+    from sd_index.db_schema import FTS_TOKENIZER
+    import webui.search_utils as su, webui.main as wm
+    if FTS_TOKENIZER != 'trigram':
+        pytest.skip('SQLite build lacks the trigram tokenizer')
+    su.reset_fts_probes()
+    with sqlite3.connect(sim.DB_PATH) as conn:
+        sim.drop_fts(conn); conn.commit()
+        # Probed mid-rebuild: answers False but does not cache it
+        assert su._files_fts_trigram() is False and su._FILES_FTS_TRIGRAM is None
+        sim.ensure_fts(conn); conn.commit()
+    assert su._files_fts_trigram() is True
+    # A forced FTS re-check drops cached probes so a changed tokenizer is seen
+    wm.ensure_fts_flag(force_recheck=True)
+    assert su._FILES_FTS_TRIGRAM is None
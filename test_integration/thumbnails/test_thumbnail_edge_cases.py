@@ -31,3 +31,41 @@ def test_thumbnail_missing_file_placeholder(test_client: TestClient, tmp_path):
     r = test_client.get(f'/thumb/{target_id}')
     assert r.status_code == 200
     assert r.headers.get('content-type','').startswith(('image/png','image/svg'))
+
+@pytest.mark.integration
+@pytest.mark.thumbnails
+def test_thumbnail_served_from_disk_cache(monkeypatch, test_client: TestClient):
+    import webui.main as wm
+    with wm.get_db_connection() as conn:
+        row = conn.execute("SELECT id, file_hash FROM files WHERE file_hash IS NOT NULL AND file_hash <> '' LIMIT 1").fetchone()
+    if not row:
+        pytest.skip('No hashed rows to cache thumbnails for')
+    first = test_client.get(f'/thumb/{row["id"]}?h=48')
+    assert first.status_code == 200 and first.headers['content-type'] == 'image/jpeg'
+    assert os.path.isfile(wm._thumb_cache_path(row['file_hash'], 48))
+    # A cache hit must not decode the source again
+    from PIL import Image as PILImage
+    monkeypatch.setattr(PILImage, 'open', lambda *a, **k: (_ for _ in ()).throw(RuntimeError('decoded')))
+    again = test_client.get(f'/thumb/{row["id"]}?h=48')
+    assert again.status_code == 200 and again.content == first.content
+
+@pytest.mark.integration
+@pytest.mark.thumbnails
+def test_thumbnail_cache_pruned_oldest_first(monkeypatch, tmp_path):
+    import webui.main as wm
+    monkeypatch.setattr(wm, 'THUMB_CACHE_DIR', str(tmp_path / 'tc'))
+    monkeypatch.setattr(wm, 'THUMB_CACHE_MAX_BYTES', 3000)
+    monkeypatch.setattr(wm, '_thumb_cache_bytes', None)
+    monkeypatch.setattr(wm, 'THUMB_CACHE_ENABLED', True)
+    paths = []
+    for i in range(5):
+        p = wm._thumb_cache_path(f'b3:{i:04x}', 64)
+        wm._store_thumb(p, b'x' * 1000)
+        os.utime(p, (1_000_000 + i, 1_000_000 + i))  # i = recency
+        paths.append(p)
+    # Cap 3000 -> pruned to <= 2700 whenever exceeded; the newest entries survive
+    kept = [os.path.exists(p) for p in paths]
+    assert sum(kept) <= 3 and kept[-1]
+    assert wm._thumb_cache_bytes == 1000 * sum(kept)
+    wm._prune_thumb_cache()
+    assert not kept[0] and not os.path.exists(paths[0])
@@ -41,3 +41,153 @@ def test_search_queries_and_perf_logged(test_client: TestClient, perf_log):
     elapsed_ms = (time.time() - t0) * 1000
     with open(perf_log, 'a', encoding='utf-8') as f:
         f.write(f'search_sample_ms={elapsed_ms:.2f}\n')
+
+@pytest.mark.integration
+@pytest.mark.webui
+@pytest.mark.parametrize('sort_field', ["file_name","file_mtime","id"])
+@pytest.mark.parametrize('order', ['asc','desc'])
+def test_keyset_next_page_matches_offset(test_client: TestClient, sort_field, order):
+    import re
+    ids = lambda html: re.findall(r'/thumb/(\d+)', html)
+    base = {'sort': sort_field, 'order': order, 'page_size': 2}
+    first = ids(test_client.get('/', params={**base, 'page': 1}).text)
+    by_offset = ids(test_client.get('/', params={**base, 'page': 2}).text)
+    by_seek = ids(test_client.get('/', params={**base, 'page': 2, 'after': first[-1]}).text)
+    assert first and by_seek == by_offset
+
+@pytest.mark.integration
+@pytest.mark.webui
+def test_field_filters_use_extracted_columns(test_client: TestClient):
+    import webui.main as wm
+    with wm.get_db_connection() as conn:
+        row = conn.execute("SELECT model_name, seed FROM models WHERE model_name IS NOT NULL AND model_name <> '' LIMIT 1").fetchone()
+    if not row:
+        pytest.skip('No extracted models in test corpus')
+    prefix = row['model_name'][:3].swapcase()
+    with wm.get_db_connection() as conn:
+        expected = {r[0] for r in conn.execute("SELECT file_id FROM models WHERE lower(model_name) LIKE lower(?)", (row['model_name'][:3] + '%',))}
+    got = set(test_client.get('/matching_ids', params={'search': f'model:{prefix}'}).json()['ids'])
+    assert got == expected
+    if row['seed'] is not None:
+        assert test_client.get('/matching_ids', params={'search': f"seed:{row['seed']}"}).json()['ids']
+    # Terms that don't parse as a filter are ordinary text, never a 400
+    from webui.search_utils import build_where
+    for text in ('seed:abc', 'lora:detail:0.8', 'Steps: 20', 'foo:bar'):
+        assert test_client.get('/matching_ids', params={'search': text}).status_code == 200
+        assert 'LIKE' in build_where(text, [], [], False)[0]
+    assert 'models' in build_where('steps:20', [], [], False)[0]
+
+@pytest.mark.integration
+@pytest.mark.webui
+def test_trailing_star_prefix_term_matches_like_plain_term(test_client: TestClient):
+    plain = test_client.get('/matching_count', params={'search': 'pn'}).json()['total']
+    starred = test_client.get('/matching_count', params={'search': 'pn*'}).json()['total']
+    assert plain > 0 and starred == plain
+
+@pytest.mark.integration
+@pytest.mark.webui
+def test_relevance_sort_returns_same_matches(test_client: TestClient):
+    import re, webui.main as wm
+    if not wm.ensure_fts_flag():
+        pytest.skip('FTS not available')
+    ids = lambda params: set(re.findall(r'/thumb/(\d+)', test_client.get('/', params={**params, 'page_size': 200}).text))
+    recent = ids({'search': 'png'})
+    ranked = ids({'search': 'png', 'sort': 'relevance'})
+    assert recent and ranked == recent
+    # No free-text search: falls back to the default order rather than failing
+    assert test_client.get('/', params={'sort': 'relevance', 'page_size': 5}).status_code == 200
+
+@pytest.mark.integration
+@pytest.mark.webui
+def test_concurrent_count_misses_run_one_query(monkeypatch):
+    import threading, webui.main as wm
+    calls = []
+    gate = threading.Event()
+    class SlowConn:
+        def __enter__(self): return self
+        def __exit__(self, *a): pass
+        def cursor(self): return self
+        def execute(self, *a, **k):
+            calls.append(a); gate.wait(2); return self
+        def fetchone(self): return (42,)
+    monkeypatch.setattr(wm, 'get_db_connection', lambda: SlowConn())
+    wm._invalidate_count_cache()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(wm._cached_total('id > ?', [-7]))) for _ in range(8)]
+    for t in threads: t.start()
+    time.sleep(0.2); gate.set()
+    for t in threads: t.join(5)
+    wm._invalidate_count_cache()
+    assert results == [42] * 8 and len(calls) == 1
+
+@pytest.mark.integration
+@pytest.mark.webui
+def test_matching_ids_binary_format_matches_json(test_client: TestClient):
+    from array import array
+    as_json = test_client.get('/matching_ids').json()
+    r = test_client.get('/matching_ids', params={'format': 'bin'})
+    assert r.status_code == 200 and r.headers['content-type'] == 'application/octet-stream'
+    ids = array('q'); ids.frombytes(r.content)
+    assert list(ids) == as_json['ids'] and r.headers['x-truncated'] == ('1' if as_json['truncated'] else '0')
+
+@pytest.mark.integration
+@pytest.mark.webui
+def test_matching_ids_ndjson_stream_matches_json(test_client: TestClient):
+    as_json = test_client.get('/matching_ids').json()
+    r = test_client.get('/matching_ids', params={'format': 'ndjson'})
+    assert r.status_code == 200 and r.headers['content-type'].startswith('application/x-ndjson')
+    lines = r.text.splitlines()
+    if as_json['truncated']:
+        assert lines.pop() == '{"truncated":true}'
+    assert [int(x) for x in lines] == as_json['ids']
+
+@pytest.mark.integration
+@pytest.mark.webui
+def test_matching_ids_stream_returns_connection_when_never_sent(test_client: TestClient, monkeypatch):
+    import asyncio, gc
+    import webui.main as wm
+    released = []
+    real_release = wm._db_pool.release
+    monkeypatch.setattr(wm._db_pool, 'release', lambda conn, ident: (released.append(conn), real_release(conn, ident)))
+    # Client gone before the body was sent: only the background task runs
+    resp = wm._stream_matching_ids('', [], 10)
+    asyncio.run(resp.background())
+    asyncio.run(resp.background())  # idempotent
+    assert len(released) == 1
+    # Response dropped without being served at all: the primed generator's cleanup releases
+    resp = wm._stream_matching_ids('', [], 10)
+    del resp; gc.collect()
+    assert len(released) == 2
+
+@pytest.mark.integration
+@pytest.mark.webui
+def test_gallery_bounded_count(test_client: TestClient, monkeypatch):
+    import re
+    import webui.main as wm
+    total = len(test_client.get('/matching_ids').json()['ids'])
+    monkeypatch.setattr(wm, 'COUNT_ESTIMATE_STEP', 1)
+    wm._invalidate_count_cache()
+    r = test_client.get('/', params={'page_size': 1, 'exact_count': 0})
+    assert r.status_code == 200
+    # page_size=1 on page 1 caps the count at 2 rows
+    shown = re.search(r'\((\d+)(\+?) images\)', r.text)
+    assert shown.groups() == (('2', '+') if total > 2 else (str(total), ''))
+    exact = test_client.get('/', params={'page_size': 1})
+    assert f'({total} images)' in exact.text
+    wm._invalidate_count_cache()
+
+@pytest.mark.integration
+@pytest.mark.webui
+def test_boolean_query_with_short_token_under_trigram(test_client: TestClient):
+    import webui.main as wm
+    from webui.search_utils import _files_fts_trigram
+    if not wm.ensure_fts_flag(force_recheck=True) or not _files_fts_trigram():
+        pytest.skip('needs a trigram files_fts')
+    total = lambda s: test_client.get('/matching_count', params={'search': s}).json()['total']
+    with wm.get_db_connection() as conn:
+        expected = conn.execute("SELECT COUNT(*) FROM files WHERE (metadata_json LIKE '%pn%' OR file_path LIKE '%pn%') "
+                                "AND (metadata_json LIKE '%png%' OR file_path LIKE '%png%')").fetchone()[0]
+    # 'pn' is too short for trigram MATCH; the expression must keep its boolean meaning
+    assert expected > 0 and total('pn AND png') == expected
+    assert total('"pn" OR png') >= expected
+    assert total('png NOT pn') == 0  # every 'png' contains 'pn'
@@ -18,6 +18,65 @@ def test_metadata_and_thumbnail_chain(test_client: TestClient, perf_log):
     with open(perf_log, 'a', encoding='utf-8') as f:
         f.write(f'thumb_time_ms={(t1-t0)*1000:.2f}\n')
 
+@pytest.mark.integration
+@pytest.mark.webui
+def test_image_and_thumb_revalidate_with_304(test_client: TestClient):
+    fid = test_client.get('/matching_ids').json()['ids'][0]
+    for url in (f'/image/{fid}', f'/thumb/{fid}', f'/thumb/{fid}?h=64', f'/metadata/{fid}'):
+        first = test_client.get(url)
+        assert first.status_code == 200 and first.headers.get('etag')
+        again = test_client.get(url, headers={'If-None-Match': first.headers['etag']})
+        assert again.status_code == 304 and again.headers['etag'] == first.headers['etag'] and not again.content
+    # Thumbnail sizes are distinct representations
+    assert test_client.get(f'/thumb/{fid}').headers['etag'] != test_client.get(f'/thumb/{fid}?h=64').headers['etag']
+    stale = test_client.get(f'/image/{fid}', headers={'If-None-Match': '"0-0"'})
+    assert stale.status_code == 200
+
+@pytest.mark.integration
+@pytest.mark.webui
+def test_image_path_cache_recovers_from_stale_entry(test_client: TestClient):
+    import time as _t
+    import webui.main as wm
+    fid = test_client.get('/matching_ids').json()['ids'][0]
+    assert test_client.get(f'/image/{fid}').status_code == 200
+    real = wm.app.state.path_cache[fid]
+    # A path that went stale outside this process is re-read from the DB, not 404'd
+    wm.app.state.path_cache[fid] = ('/nonexistent/gone.png', real[1], _t.time())
+    assert test_client.get(f'/image/{fid}').status_code == 200
+    assert wm.app.state.path_cache[fid][0] == real[0]
+    wm._invalidate_count_cache()
+    assert fid not in wm.app.state.path_cache
+
+@pytest.mark.integration
+@pytest.mark.webui
+def test_image_path_cache_dropped_after_db_rebuild(test_client: TestClient, tmp_path):
+    import webui.main as wm
+    assert test_client.get('/image/1').status_code == 200
+    assert 1 in wm.app.state.path_cache
+    # Rebuild from the CLI: the fresh DB hands id 1 to a different file
+    other = tmp_path / 'rebuilt'; other.mkdir()
+    replacement = (other / 'only.png'); replacement.write_bytes(b'not the old image')
+    sim.clear_database(); sim.init_db(); sim.index_files(str(other), full_refresh=False)
+    with sqlite3.connect(sim.DB_PATH) as conn:
+        assert conn.execute('SELECT file_path FROM files WHERE id = 1').fetchone()[0] == str(replacement)
+    r = test_client.get('/image/1')
+    assert r.status_code == 200 and r.content == b'not the old image'
+
+@pytest.mark.integration
+@pytest.mark.webui
+def test_metadata_gzip_for_large_blobs(test_client: TestClient, monkeypatch):
+    import webui.main as wm
+    fid = test_client.get('/matching_ids').json()['ids'][0]
+    plain = test_client.get(f'/metadata/{fid}', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in plain.headers
+    monkeypatch.setattr(wm, '_GZIP_MIN_BYTES', 0)
+    gz = test_client.get(f'/metadata/{fid}', headers={'Accept-Encoding': 'gzip'})
+    assert gz.headers['content-encoding'] == 'gzip' and gz.json() == plain.json()
+    if 'etag' in gz.headers:
+        assert gz.headers['etag'] != plain.headers['etag']
+        again = test_client.get(f'/metadata/{fid}', headers={'Accept-Encoding': 'gzip', 'If-None-Match': gz.headers['etag']})
+        assert again.status_code == 304
+
 @pytest.mark.integration
 @pytest.mark.webui
 def test_favicon_served_or_empty(test_client: TestClient):
@@ -30,6 +89,20 @@ def test_metadata_fields_endpoint_returns_list(test_client: TestClient):
     r = test_client.get('/metadata_fields')
     assert r.status_code == 200 and isinstance(r.json(), list)
 
+@pytest.mark.integration
+@pytest.mark.webui
+def test_metadata_fields_json1_matches_python_fallback(test_client: TestClient, monkeypatch):
+    import webui.main as wm
+    via_json1 = test_client.get('/metadata_fields').json()
+    monkeypatch.setattr(wm.app.state, 'has_json1', False, raising=False)
+    wm._invalidate_count_cache()  # results are cached; force the fallback to run
+    assert test_client.get('/metadata_fields').json() == via_json1 and via_json1
+    # Cached until a file operation invalidates it
+    monkeypatch.setattr(wm, '_metadata_keys_python', lambda cur: ['recomputed'])
+    assert test_client.get('/metadata_fields').json() == via_json1
+    wm._invalidate_count_cache()
+    assert test_client.get('/metadata_fields').json() == ['recomputed']
+
 @pytest.mark.integration
 @pytest.mark.webui
 def test_time_facets_and_cache_behavior(test_client: TestClient):
@@ -57,3 +130,30 @@ def test_time_filter_utc_specific_bucket(test_client: TestClient):
     year = '2024'; month = '01'
     r = test_client.get('/matching_count', params={'sort':'file_mtime','year':year,'month':month})
     assert r.status_code == 200 and r.json()['total'] >= 1
+
+@pytest.mark.integration
+@pytest.mark.webui
+def test_time_facets_cached_until_invalidated(test_client: TestClient):
+    import webui.main as wm
+    first = test_client.get('/time_facets', params={'column': 'file_mtime'}).json()
+    with sqlite3.connect(sim.DB_PATH) as conn:
+        conn.execute('UPDATE files SET file_mtime=? WHERE id=(SELECT id FROM files LIMIT 1)', (946684800,)); conn.commit()  # 2000-01-01 UTC
+    assert test_client.get('/time_facets', params={'column': 'file_mtime'}).json() == first
+    wm._invalidate_count_cache()
+    assert '2000' in test_client.get('/time_facets', params={'column': 'file_mtime'}).json()['years']
+
+@pytest.mark.integration
+@pytest.mark.webui
+def test_time_facets_index_seek_matches_strftime(test_client: TestClient):
+    import webui.main as wm
+    with sqlite3.connect(sim.DB_PATH) as conn:
+        ids = [r[0] for r in conn.execute('SELECT id FROM files ORDER BY id LIMIT 3')]
+        # Bucket edges: last second of 1999, first second of 2000, mid-December 2023
+        for fid, ts in zip(ids, (946684799, 946684800, 1702598400)):
+            conn.execute('UPDATE files SET file_mtime=? WHERE id=?', (ts, fid))
+        conn.commit()
+        expected = [r[0] for r in conn.execute("SELECT DISTINCT strftime('%Y', datetime(file_mtime, 'unixepoch')) y FROM files WHERE file_mtime IS NOT NULL ORDER BY y DESC")]
+        expected_months = [r[0] for r in conn.execute("SELECT DISTINCT strftime('%m', datetime(file_mtime, 'unixepoch')) m FROM files WHERE strftime('%Y', datetime(file_mtime, 'unixepoch'))='1999' ORDER BY m")]
+    wm._invalidate_count_cache()
+    assert test_client.get('/time_facets', params={'column': 'file_mtime'}).json()['years'] == expected
+    assert test_client.get('/time_facets', params={'column': 'file_mtime', 'year': '1999'}).json()['months'] == expected_months
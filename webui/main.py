@@ -1,23 +1,47 @@
 import os
+import json
+import stat
 import sqlite3
 import time
 import threading
 import uuid
+import errno
+import sys
+import asyncio
+import gzip
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import datetime as _dt
 import calendar as _cal
 from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
 from typing import List, Optional, Sequence, Tuple, Dict, Any
 
 from fastapi import FastAPI, Request, Query, HTTPException, Body
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, Response
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 import re
-from .search_utils import build_where, SearchBuildError
+from .search_utils import build_where, rank_match, reset_fts_probes, SearchBuildError
+from sd_index.connection import tune_connection
 from io import BytesIO
 from PIL import Image
+try:  # optional: faster JSON encoding for every JSON endpoint
+    import orjson
+    from fastapi.responses import ORJSONResponse as _JSONResponseClass
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+    _JSONResponseClass = JSONResponse
+try:  # optional: libvips thumbnails (shrink-on-load, no full-size raster in Python)
+    import pyvips as _pyvips
+except Exception:  # pragma: no cover - optional dependency (ImportError or missing libvips)
+    _pyvips = None
 
-app = FastAPI()
+app = FastAPI(default_response_class=_JSONResponseClass)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Reuse core DB path (supports SD_DB_PATH env override). Fallback to legacy location if import fails.
@@ -28,6 +52,19 @@ except Exception:  # pragma: no cover - fallback safety
     DB_PATH = os.path.join(os.path.dirname(BASE_DIR), "sd_index.db")
 MAX_PAGE_SIZE = 200
 PLACEHOLDER_ON_MISSING = os.getenv("SD_THUMB_PLACEHOLDER_ON_MISSING", "1") == "1"
+# Generated thumbnails are kept on disk keyed by content hash + height, so a
+# repeat view skips the PIL decode/resize and an entry never goes stale (changed
+# content gets a new hash). Defaults to a folder next to the active DB.
+THUMB_CACHE_ENABLED = os.getenv("SD_THUMB_CACHE", "1") == "1"
+_thumb_dir = os.getenv("SD_THUMB_CACHE_DIR", "").strip()
+THUMB_CACHE_DIR = os.path.abspath(_thumb_dir) if _thumb_dir else os.path.join(os.path.dirname(DB_PATH), "thumb_cache")
+# Size cap for the cache; past it the least recently used entries (oldest mtime)
+# are pruned down to 90%. Thumbnails of deleted / de-duplicated files simply
+# age out this way. 0 = unbounded.
+try:
+    THUMB_CACHE_MAX_BYTES = max(0, int(os.getenv("SD_THUMB_CACHE_MAX_MB", "1024"))) * 1024 * 1024
+except ValueError:
+    THUMB_CACHE_MAX_BYTES = 1024 * 1024 * 1024
 
 # Optional configured allowed roots for file operations (restrict destructive ops)
 def _canonical_path(p: str) -> str:
@@ -45,6 +82,12 @@ else:
     else:
         ALLOWED_ROOTS = None  # unrestricted (default local usage)
 
+# Normalised once so the per-file check is one set lookup plus one C-level
+# str.startswith over all roots (a trailing separator is stripped first, so "/"
+# and "D:\\" roots match their children too).
+_ALLOWED_ROOT_SET = frozenset(r.rstrip(os.sep) or os.sep for r in (ALLOWED_ROOTS or ()))
+_ALLOWED_ROOT_PREFIXES = tuple(sorted({r.rstrip(os.sep) + os.sep for r in (ALLOWED_ROOTS or ())}))
+
 DESTRUCTIVE_DISABLED = os.getenv("SD_DISABLE_DESTRUCTIVE_OPS", "0") == "1"
 
 templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "templates"))
@@ -63,23 +106,117 @@ def favicon():
         return FileResponse(fav_path, media_type="image/png", headers=headers)
     return Response(status_code=204)
 
-def get_db_connection():
-    """Return a new sqlite3 connection tuned for read speed.
+DB_POOL_SIZE = max(1, int(os.getenv("SD_DB_POOL_SIZE", "8") or 8))
+# Per-connection prepared-statement LRU (sqlite3 keys it by SQL text). Pooled
+# connections live for the whole process, so the hot fixed-shape lookups below
+# are parsed once per connection; the headroom keeps dynamic search/sort
+# variants from evicting them.
+DB_STATEMENT_CACHE = 256
 
-    We use WAL mode already (set during indexing). For read-heavy
-    web usage we can safely set a few pragmas per connection.
-    """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+# Fixed-shape hot queries: one constant each so every call site reuses the
+# same cached statement.
+_SQL_FILE_BY_ID = "SELECT file_path, file_hash FROM files WHERE id = ?"
+_SQL_METADATA_BY_ID = "SELECT metadata_json, file_hash, last_scanned FROM files WHERE id = ?"
+_SQL_COUNT_FILES = "SELECT COUNT(*) FROM files"
+_SQL_ALL_IDS_LIMIT = "SELECT id FROM files LIMIT ?"
+
+def _db_identity():
     try:
-        # Hints that can help large page navigation (best-effort)
-        conn.execute("PRAGMA cache_size = -80000")  # ~80MB page cache (negative => KB)
-        conn.execute("PRAGMA temp_store = MEMORY")
-        conn.execute("PRAGMA mmap_size = 300000000")
-    except sqlite3.Error:
-        pass
+        st = os.stat(DB_PATH)
+        return (st.st_dev, st.st_ino)
+    except OSError:
+        return None
+
+def _open_db_connection() -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_PATH, timeout=30.0, check_same_thread=False, cached_statements=DB_STATEMENT_CACHE)
+    conn.row_factory = sqlite3.Row
+    # WAL, synchronous=NORMAL, busy_timeout, mmap + page cache sizing (best-effort)
+    tune_connection(conn)
     return conn
 
+class _ConnectionPool:
+    """Long-lived connections shared across requests and job threads.
+
+    A connection is leased to one thread at a time. Each one remembers the
+    DB file it opened (device, inode): when the file has been replaced
+    (clear / rebuild from the CLI) it is closed on checkout and a fresh one
+    opened, so a stale handle never serves a deleted database. Connections
+    beyond ``size`` are opened on demand and closed when returned.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._idle: List[Tuple[sqlite3.Connection, Any]] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Tuple[sqlite3.Connection, Any]:
+        ident = _db_identity()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, conn_ident = self._idle.pop()
+            if conn_ident == ident and ident is not None:
+                return conn, conn_ident
+            conn.close()
+        conn = _open_db_connection()
+        return conn, _db_identity()
+
+    def release(self, conn: sqlite3.Connection, ident: Any) -> None:
+        with self._lock:
+            if len(self._idle) < self._size:
+                self._idle.append((conn, ident))
+                return
+        conn.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+_db_pool = _ConnectionPool(DB_POOL_SIZE)
+
+class _PooledConnection:
+    """``with get_db_connection() as conn``: lease a pooled connection.
+
+    Keeps sqlite3's context-manager contract (commit on success, rollback on
+    error) and returns the connection to the pool afterwards.
+    """
+    __slots__ = ("_conn", "_ident")
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._conn, self._ident = _db_pool.acquire()
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        conn = self._conn
+        try:
+            if exc_type is None:
+                conn.commit()
+            else:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return False
+        _db_pool.release(conn, self._ident)
+        return False
+
+def get_db_connection() -> _PooledConnection:
+    """Lease a tuned connection from the process-wide pool (use as ``with``)."""
+    return _PooledConnection()
+
+# Close pooled connections on server shutdown
+app.router.on_shutdown.append(_db_pool.close_all)
+
+# Probe result as plain module globals: the common "FTS is present" case is a
+# single global read per request instead of hasattr/getattr on app.state.
+_HAS_FTS = False
+_FTS_CHECKED_AT = 0.0
+
 def ensure_fts_flag(force_recheck: bool = False):
     """Cache (with occasional refresh) presence of suitable FTS5 table.
 
@@ -88,114 +225,274 @@ def ensure_fts_flag(force_recheck: bool = False):
     force_recheck=True (used by /refresh_fts endpoint) or automatically every
     REFRESH_INTERVAL seconds when previously false.
     """
+    global _HAS_FTS, _FTS_CHECKED_AT
+    if _HAS_FTS and not force_recheck:
+        return True
     REFRESH_INTERVAL = 60.0
     now = time.time()
-    if force_recheck or not hasattr(app.state, 'has_fts') or not getattr(app.state, 'has_fts', False):
-        last = getattr(app.state, 'fts_checked_at', 0)
-        if force_recheck or (now - last) > REFRESH_INTERVAL:
-            try:
-                with get_db_connection() as conn:
-                    cur = conn.cursor()
-                    cur.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='files_fts'")
-                    row = cur.fetchone()
-                    if not row:
-                        app.state.has_fts = False
-                    else:
-                        ddl = row[0] if isinstance(row[0], str) else ''
-                        has_paths = ('path' in ddl and 'path_norm' in ddl)
-                        valid = bool(has_paths)
-                        if valid:
-                            # Additional integrity heuristic: if FTS docsize table has zero rows while files table has rows, treat FTS as unusable.
-                            try:
-                                cur.execute("SELECT COUNT(*) FROM files")
-                                total_files = cur.fetchone()[0]
-                                cur.execute("SELECT COUNT(*) FROM files_fts_docsize")
-                                fts_docs = cur.fetchone()[0]
-                                if total_files > 0 and fts_docs == 0:
-                                    # Flag unusable; caller will fall back to LIKE search.
-                                    valid = False
-                                    if not getattr(app.state, 'fts_empty_warned', False):
-                                        print("[WARN] Detected empty FTS index (0 docs) while files table has", total_files, "rows. Falling back to non-FTS search. Re-run indexing to rebuild FTS.")
-                                        app.state.fts_empty_warned = True  # type: ignore[attr-defined]
-                            except sqlite3.Error:
-                                # On any error assume invalid so we don't block searches.
+    if force_recheck or (now - _FTS_CHECKED_AT) > REFRESH_INTERVAL:
+        # The table may have been dropped / rebuilt (possibly with another tokenizer)
+        reset_fts_probes()
+        try:
+            with get_db_connection() as conn:
+                cur = conn.cursor()
+                cur.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='files_fts'")
+                row = cur.fetchone()
+                if not row:
+                    _HAS_FTS = False
+                else:
+                    ddl = row[0] if isinstance(row[0], str) else ''
+                    has_paths = ('path' in ddl and 'path_norm' in ddl)
+                    valid = bool(has_paths)
+                    if valid:
+                        # Additional integrity heuristic: if FTS docsize table has zero rows while files table has rows, treat FTS as unusable.
+                        try:
+                            cur.execute(_SQL_COUNT_FILES)
+                            total_files = cur.fetchone()[0]
+                            cur.execute("SELECT COUNT(*) FROM files_fts_docsize")
+                            fts_docs = cur.fetchone()[0]
+                            if total_files > 0 and fts_docs == 0:
+                                # Flag unusable; caller will fall back to LIKE search.
                                 valid = False
-                        app.state.has_fts = valid
-            except sqlite3.Error:
-                app.state.has_fts = False
-            app.state.fts_checked_at = now
-    return getattr(app.state, 'has_fts', False)
+                                if not getattr(app.state, 'fts_empty_warned', False):
+                                    print("[WARN] Detected empty FTS index (0 docs) while files table has", total_files, "rows. Falling back to non-FTS search. Re-run indexing to rebuild FTS.")
+                                    app.state.fts_empty_warned = True  # type: ignore[attr-defined]
+                        except sqlite3.Error:
+                            # On any error assume invalid so we don't block searches.
+                            valid = False
+                    _HAS_FTS = valid
+        except sqlite3.Error:
+            _HAS_FTS = False
+        _FTS_CHECKED_AT = now
+    return _HAS_FTS
 
 ensure_fts_flag()
 
+def _fts_for(search: str, values: Optional[Sequence[str]]) -> bool:
+    """FTS availability for a query; unfiltered requests skip the (periodic) probe."""
+    if not search and not any(v.strip() for v in values or []):
+        return False
+    return ensure_fts_flag()
+
 # Simple in-process count cache to avoid repeating COUNT(*) for rapid page flips.
 # Key: (where_sql, tuple(params)) -> (total, timestamp)
 COUNT_CACHE_TTL = 5.0  # seconds
+# Year/month facets scan every row through strftime; they change rarely, so
+# keep them longer. Key: (column, year) -> (result, timestamp)
+FACET_CACHE_TTL = 60.0  # seconds
 def _invalidate_count_cache():
     try:
-        app.state.count_cache.clear()  # type: ignore[attr-defined]
+        with _COUNT_CACHE_LOCK:
+            app.state.count_cache.clear()  # type: ignore[attr-defined]
+        app.state.facet_cache.clear()  # type: ignore[attr-defined]
+        app.state.fields_cache = None  # type: ignore[attr-defined]
+        app.state.summary_cache = None  # type: ignore[attr-defined]
+        with _PATH_CACHE_LOCK:
+            app.state.path_cache.clear()  # type: ignore[attr-defined]
     except Exception:
         pass
 MAX_COUNT_CACHE_ENTRIES = 128
 if not hasattr(app.state, 'count_cache'):
     # runtime attribute; keep simple to avoid Python <3.11 attribute annotation issues
-    app.state.count_cache = {}  # type: ignore[attr-defined]
+    app.state.count_cache = OrderedDict()  # type: ignore[attr-defined]  # LRU order: oldest first
+if not hasattr(app.state, 'facet_cache'):
+    app.state.facet_cache = {}  # type: ignore[attr-defined]
+if not hasattr(app.state, 'fields_cache'):
+    app.state.fields_cache = None  # (keys, timestamp) for /metadata_fields; same TTL as facets
+if not hasattr(app.state, 'summary_cache'):
+    app.state.summary_cache = None  # (result, timestamp) for /extraction_summary; same TTL as facets
 import threading as _threading
 if not hasattr(app.state, 'jobs'):
-    app.state.jobs = {}  # type: ignore[attr-defined]
+    app.state.jobs = OrderedDict()  # type: ignore[attr-defined]  # oldest / least recently polled first
 if not hasattr(app.state, 'jobs_lock'):
     app.state.jobs_lock = _threading.Lock()  # type: ignore[attr-defined]
 
-def _cached_total(where_sql: str, params: List[Any]) -> int:
-    """Return cached total row count for a WHERE clause if fresh; else compute & cache."""
-    key = (where_sql, tuple(params))
+_COUNT_CACHE_LOCK = _threading.Lock()
+
+# id -> (file_path, file_hash, timestamp) for /image and /thumb: gallery
+# scrolling re-requests the same ids, and a row's path only changes through
+# file operations (which clear this) or an external re-index (bounded by the TTL).
+# A clear / rebuild from the CLI reuses ids for different files, so the cache is
+# also dropped whenever the DB file identity (device, inode) changes. Pooled
+# connections keep the old file open, so a replacement never gets its inode.
+PATH_CACHE_TTL = 30.0  # seconds
+MAX_PATH_CACHE_ENTRIES = 50_000
+if not hasattr(app.state, 'path_cache'):
+    app.state.path_cache = OrderedDict()  # type: ignore[attr-defined]  # LRU order: oldest first
+    app.state.path_cache_ident = None  # type: ignore[attr-defined]
+_PATH_CACHE_LOCK = _threading.Lock()
+
+def _lookup_file(file_id: int, use_cache: bool = True) -> Tuple[str, Optional[str], bool]:
+    """``(file_path, file_hash, from_cache)`` for an id; 404 when the row is gone.
+
+    Callers that find a cached path missing on disk retry with
+    ``use_cache=False`` so a stale entry never hides a moved file.
+    """
+    cache = app.state.path_cache
     now = time.time()
+    ident = _db_identity()
+    with _PATH_CACHE_LOCK:
+        if ident != app.state.path_cache_ident:  # type: ignore[attr-defined]
+            cache.clear()
+            app.state.path_cache_ident = ident  # type: ignore[attr-defined]
+        if use_cache:
+            hit = cache.get(file_id)
+            if hit is not None and now - hit[2] < PATH_CACHE_TTL:
+                cache.move_to_end(file_id)
+                return hit[0], hit[1], True
+    try:
+        with get_db_connection() as conn:
+            row = conn.execute(_SQL_FILE_BY_ID, (file_id,)).fetchone()
+    except sqlite3.Error:
+        raise HTTPException(status_code=500, detail="Database error")
+    with _PATH_CACHE_LOCK:
+        if not row:
+            cache.pop(file_id, None)
+            raise HTTPException(status_code=404, detail="Image not found")
+        if ident == app.state.path_cache_ident:  # type: ignore[attr-defined]  # not swapped mid-lookup
+            cache[file_id] = (row[0], row[1], now)
+            cache.move_to_end(file_id)
+            if len(cache) > MAX_PATH_CACHE_ENTRIES:
+                cache.popitem(last=False)  # least recently used
+    return row[0], row[1], False
+# Single-flight: key -> Event of the request currently computing that COUNT(*).
+# Concurrent misses on the same filter wait for it instead of re-running the scan.
+_COUNT_INFLIGHT: Dict[Tuple[str, Tuple[Any, ...], Optional[int]], threading.Event] = {}
+
+# exact_count=0: the gallery counts at most this many rows past the current
+# page (in steps of this size), so a broad filter over a huge library costs a
+# bounded scan and the UI shows "N+ images" instead of an exact total.
+COUNT_ESTIMATE_STEP = 10_000
+
+def _fresh_total(where_sql: str, params: List[Any], cap: Optional[int] = None) -> Optional[int]:
+    """Cached total for a WHERE clause if still fresh, else None (never computes)."""
+    key = (where_sql, tuple(params), cap)
+    with _COUNT_CACHE_LOCK:
+        hit = app.state.count_cache.get(key)
+        if hit is not None and time.time() - hit[1] < COUNT_CACHE_TTL:
+            app.state.count_cache.move_to_end(key)
+            return hit[0]
+    return None
+
+# Cache-miss counts for the gallery run here, on their own connection, while
+# the request thread fetches the page; SQLite drops the GIL inside each step.
+_COUNT_WORKERS = 4
+_COUNT_POOL: Optional[ThreadPoolExecutor] = None
+
+def _start_total(where_sql: str, params: List[Any], cap: Optional[int] = None):
+    """Future for ``_cached_total`` on the count pool."""
+    global _COUNT_POOL
+    if _COUNT_POOL is None:
+        _COUNT_POOL = ThreadPoolExecutor(max_workers=_COUNT_WORKERS, thread_name_prefix="gallery-count")
+    return _COUNT_POOL.submit(_cached_total, where_sql, params, cap)
+
+def _cached_total(where_sql: str, params: List[Any], cap: Optional[int] = None) -> int:
+    """Return cached total row count for a WHERE clause if fresh; else compute & cache.
+
+    With ``cap`` the count stops after ``cap + 1`` matches, so any result
+    above ``cap`` means "more than cap".
+    """
+    key = (where_sql, tuple(params), cap)
     cache = app.state.count_cache
-    if key in cache:
-        total, ts = cache[key]
-        if now - ts < COUNT_CACHE_TTL:
-            return total
-        else:
-            # stale; drop so we recompute
-            cache.pop(key, None)
-    # Need compute
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        if where_sql:
-            cur.execute(f"SELECT COUNT(*) FROM files WHERE {where_sql}", params)
-        else:
-            cur.execute("SELECT COUNT(*) FROM files")
-        total = cur.fetchone()[0]
-    # Maintain size bound (naive LRU eviction)
-    if len(cache) >= MAX_COUNT_CACHE_ENTRIES:
-        # Remove oldest
-        oldest_key = min(cache.items(), key=lambda kv: kv[1][1])[0]
-        cache.pop(oldest_key, None)
-    cache[key] = (total, now)
-    return total
+    while True:
+        now = time.time()
+        with _COUNT_CACHE_LOCK:
+            hit = cache.get(key)
+            if hit is not None:
+                if now - hit[1] < COUNT_CACHE_TTL:
+                    cache.move_to_end(key)
+                    return hit[0]
+                # stale; drop so we recompute
+                cache.pop(key, None)
+            pending = _COUNT_INFLIGHT.get(key)
+            if pending is None:
+                pending = _COUNT_INFLIGHT[key] = threading.Event()
+                break
+        # Another thread is counting this filter: wait, then re-read the cache
+        # (if that thread failed, the next pass computes it here instead).
+        pending.wait()
+    try:
+        # Compute outside the lock: COUNT(*) may scan
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            if cap is not None:
+                where = f" WHERE {where_sql}" if where_sql else ""
+                cur.execute(f"SELECT COUNT(*) FROM (SELECT 1 FROM files{where} LIMIT ?)", params + [cap + 1])
+            elif where_sql:
+                cur.execute(f"SELECT COUNT(*) FROM files WHERE {where_sql}", params)
+            else:
+                cur.execute(_SQL_COUNT_FILES)
+            total = cur.fetchone()[0]
+        with _COUNT_CACHE_LOCK:
+            cache[key] = (total, now)
+            cache.move_to_end(key)
+            if len(cache) > MAX_COUNT_CACHE_ENTRIES:
+                cache.popitem(last=False)  # least recently used
+        return total
+    finally:
+        with _COUNT_CACHE_LOCK:
+            _COUNT_INFLIGHT.pop(key, None)
+        pending.set()
 
-def _validate_allowed(path: str) -> bool:
+def _is_under_allowed(p: str) -> bool:
+    """Root check for a path already passed through ``_canonical_path``."""
     if not ALLOWED_ROOTS:  # None or empty => unrestricted
         return True
-    p = _canonical_path(path)
-    for root in ALLOWED_ROOTS:
-        if p == root or p.startswith(root + os.sep):
-            return True
-    return False
+    return p in _ALLOWED_ROOT_SET or p.startswith(_ALLOWED_ROOT_PREFIXES)
 
-def _is_under_allowed(path: str) -> bool:
-    return _validate_allowed(path)
+@lru_cache(maxsize=4096)
+def _dir_allowed(canonical_dir: str) -> bool:
+    return _is_under_allowed(canonical_dir)
 
-def _safe_collision_path(dest_dir: str, filename: str) -> str:
-    target = os.path.join(dest_dir, filename)
-    if not os.path.exists(target):
-        return target
+def _validate_allowed(path: str) -> bool:
+    if not ALLOWED_ROOTS:
+        return True
+    # Canonicalise first so '..' segments cannot escape a root. A file inside an
+    # allowed directory is allowed, and a batch's files share a handful of
+    # directories, so the prefix check is cached per canonical dirname; the full
+    # check only runs when the directory fails (e.g. the path is itself a root).
+    canon = _canonical_path(path)
+    return _dir_allowed(os.path.dirname(canon)) or _is_under_allowed(canon)
+
+def _dir_names(dest_dir: str) -> set:
+    """Entry names in ``dest_dir`` (one scandir), for seeding ``_safe_collision_path``."""
+    try:
+        with os.scandir(dest_dir) as it:
+            return {e.name for e in it}
+    except OSError:
+        return set()
+
+def _safe_collision_path(dest_dir: str, filename: str, taken: Optional[set] = None) -> str:
+    """Reserve the first free ``dest_dir/filename`` (then ``stem_1.ext``, ...).
+
+    ``taken`` is a set of names already used in ``dest_dir``: seed it with
+    ``_dir_names`` once per batch so known collisions are skipped in memory.
+    A name missing from the set is claimed with an ``O_CREAT|O_EXCL`` open,
+    which leaves an empty placeholder that the move/copy then replaces. The
+    check and the claim are one atomic syscall, so a file created since the
+    listing (or a case-insensitive match) is never overwritten. ``_fs_apply``
+    removes the placeholder again if the operation fails.
+    """
+    name = filename
     stem, ext = os.path.splitext(filename)
     counter = 1
-    while os.path.exists(target):
-        target = os.path.join(dest_dir, f"{stem}_{counter}{ext}")
+    while True:
+        if taken is None or name not in taken:
+            try:
+                os.close(os.open(os.path.join(dest_dir, name), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+                break
+            except FileExistsError:
+                pass
+            except OSError:
+                break  # e.g. read-only destination: the move/copy reports the error
+        name = f"{stem}_{counter}{ext}"
         counter += 1
-    return target
+    if taken is not None:
+        taken.add(name)
+    return os.path.join(dest_dir, name)
+
+# Time columns the year/month filter and /time_facets accept (whitelist)
+_TIME_COLUMNS = {"file_mtime": "file_mtime", "file_ctime": "file_ctime"}
 
 def _apply_time_filter(where_sql: str, params: List[Any], sort: str, year: str, month: str) -> Tuple[str, List[Any], str, str]:
     """Given current WHERE SQL & params, append a time range filter based on sort/year/month.
@@ -204,8 +501,7 @@ def _apply_time_filter(where_sql: str, params: List[Any], sort: str, year: str,
     Time filtering only applies when sorting by file_mtime/file_ctime and a year is provided.
     Normalization: blank or 'ALL' -> ''
     """
-    time_sort_columns = {"file_mtime": "file_mtime", "file_ctime": "file_ctime"}
-    time_col = time_sort_columns.get(sort)
+    time_col = _TIME_COLUMNS.get(sort)
     year_norm = (year or '').strip()
     if year_norm.upper() == 'ALL':
         year_norm = ''
@@ -241,6 +537,52 @@ def _apply_time_filter(where_sql: str, params: List[Any], sort: str, year: str,
             pass
     return where_sql, params, year_norm, month_norm
 
+def _keyset_clause(cur: sqlite3.Cursor, sort_key: str, order_dir: str, after_id: int) -> Optional[Tuple[str, List[Any]]]:
+    """WHERE fragment selecting rows strictly after ``after_id`` in gallery order.
+
+    Gallery order is ``sort_key <dir>, id <dir>`` (file_path compared NOCASE).
+    The fragment leads with a plain range on the sort column so SQLite seeks
+    into the sort index instead of scanning it. SQLite sorts NULLs first
+    ascending and last descending. Returns None when the anchor row no longer
+    exists, or when a descending seek would have to re-append NULL rows, so
+    the caller falls back to OFFSET.
+    """
+    lt = "<" if order_dir == "DESC" else ">"
+    if sort_key == "id":
+        return f"id {lt} ?", [after_id]
+    row = cur.execute(f"SELECT {sort_key} FROM files WHERE id = ?", (after_id,)).fetchone()
+    if row is None:
+        return None
+    value = row[0]
+    if value is None:
+        if order_dir == "DESC":  # NULLs come last: only later NULL rows remain
+            return f"({sort_key} IS NULL AND id {lt} ?)", [after_id]
+        return f"({sort_key} IS NOT NULL OR id {lt} ?)", [after_id]
+    col = f"{sort_key} COLLATE NOCASE" if sort_key == "file_path" else sort_key
+    if order_dir == "DESC" and cur.execute(f"SELECT 1 FROM files WHERE {sort_key} IS NULL LIMIT 1").fetchone():
+        # The trailing NULL rows would need an OR branch that defeats the range
+        # seek and measures slower than OFFSET, so let the caller use OFFSET.
+        return None
+    return f"({col} {lt}= ? AND ({col} {lt} ? OR id {lt} ?))", [value, value, after_id]
+
+# Gallery sort whitelist (query value -> column) and every ORDER BY it can
+# produce, built once: file names sort case-insensitively and id breaks ties
+# in the same direction so pagination is deterministic.
+_GALLERY_SORT_COLUMNS = {
+    "last_scanned": "last_scanned",
+    "file_name": "file_path",
+    "file_size": "file_size",
+    "file_mtime": "file_mtime",
+    "file_ctime": "file_ctime",
+    "width": "width",
+    "height": "height",
+    "id": "id",
+}
+_GALLERY_ORDER_CLAUSES = {
+    (col, d): f"{col}{' COLLATE NOCASE' if col == 'file_path' else ''} {d}, id {d}"
+    for col in _GALLERY_SORT_COLUMNS.values() for d in ("ASC", "DESC")
+}
+
 @app.get("/", response_class=HTMLResponse)
 def gallery(
     request: Request,
@@ -253,6 +595,8 @@ def gallery(
     order: str = Query(default="desc"),
     year: str = Query(default=""),  # YYYY or ''/ALL
     month: str = Query(default=""), # MM or ''/ALL
+    after: Optional[int] = None,    # id of the last row on the previous page (keyset "Next")
+    exact_count: bool = True,       # False: bounded count, shown as "N+" past COUNT_ESTIMATE_STEP
 ) -> HTMLResponse:
     if page < 1:
         page = 1
@@ -260,48 +604,61 @@ def gallery(
         page_size = 1
     if page_size > MAX_PAGE_SIZE:
         page_size = MAX_PAGE_SIZE
-    has_fts = ensure_fts_flag()
+    has_fts = _fts_for(search, values)
     try:
         where_sql, params = build_where(search, logics or [], values or [], has_fts)
     except SearchBuildError as e:
         raise HTTPException(status_code=400, detail=str(e))
     offset = (page - 1) * page_size
     # Sort validation & mapping (whitelist to prevent injection)
-    sort_map = {
-        "last_scanned": "last_scanned",
-        "file_name": "file_path",
-        "file_size": "file_size",
-        "file_mtime": "file_mtime",
-        "file_ctime": "file_ctime",
-        "width": "width",
-        "height": "height",
-        "id": "id",
-    }
-    sort_key = sort_map.get(sort, "last_scanned")
+    sort_key = _GALLERY_SORT_COLUMNS.get(sort, "last_scanned")
     order_dir = "ASC" if str(order).lower() == "asc" else "DESC"
-    # For file_name we want case-insensitive ordering for consistency
-    if sort_key == "file_path":
-        primary_order = f"{sort_key} COLLATE NOCASE {order_dir}"
-    else:
-        primary_order = f"{sort_key} {order_dir}"
-    # Stable secondary order (id DESC or ASC to make pagination deterministic)
-    secondary_order = "id DESC" if order_dir == "DESC" else "id ASC"
-    order_clause = f"{primary_order}, {secondary_order}"
+    order_clause = _GALLERY_ORDER_CLAUSES[sort_key, order_dir]
     # Apply time filter (if any) using shared helper
     where_sql, params, year_norm, month_norm = _apply_time_filter(where_sql, params, sort, year, month)
+    # sort=relevance orders FTS hits by bm25 (best first); without a free-text
+    # search there is nothing to rank, so it falls back to the default order.
+    rank_expr = rank_match(search, has_fts) if sort == "relevance" else None
+    # On a count-cache miss the COUNT(*) and the page query are independent:
+    # start the count first so the page is ready in max(page, count), not the sum.
+    count_cap = None if exact_count else COUNT_ESTIMATE_STEP * ((offset + page_size) // COUNT_ESTIMATE_STEP + 1)
+    total = _fresh_total(where_sql, params, count_cap)
+    total_future = _start_total(where_sql, params, count_cap) if total is None else None
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             # Important performance change: only fetch columns required for gallery list.
             select_cols = "id, file_path, file_hash, last_scanned"
-            if where_sql:
+            seek = _keyset_clause(cursor, sort_key, order_dir, after) if after is not None and page > 1 and not rank_expr else None
+            if rank_expr:
+                # bm25 is computed once per hit in the subquery; LEFT JOIN keeps rows that
+                # only matched prompts_fts (no files_fts score), ranked after scored hits.
+                cursor.execute(
+                    f"SELECT {select_cols} FROM files LEFT JOIN ("
+                    "SELECT rowid AS rid, bm25(files_fts) AS score FROM files_fts WHERE files_fts MATCH ?"
+                    f") r ON r.rid = files.id WHERE {where_sql} "
+                    "ORDER BY r.score IS NULL, r.score, id LIMIT ? OFFSET ?",
+                    [rank_expr] + params + [page_size, offset],
+                )
+            elif seek:
+                # Keyset: continue after the previous page's last row instead of skipping OFFSET rows
+                seek_sql, seek_params = seek
+                full_where = f"({where_sql}) AND {seek_sql}" if where_sql else seek_sql
+                cursor.execute(
+                    f"SELECT {select_cols} FROM files WHERE {full_where} ORDER BY {order_clause} LIMIT ?",
+                    params + seek_params + [page_size],
+                )
+            elif where_sql:
                 query = f"SELECT {select_cols} FROM files WHERE {where_sql} ORDER BY {order_clause} LIMIT ? OFFSET ?"
                 cursor.execute(query, params + [page_size, offset])
             else:
                 cursor.execute(f"SELECT {select_cols} FROM files ORDER BY {order_clause} LIMIT ? OFFSET ?", (page_size, offset))
             files = cursor.fetchall()
-            # Use (short-lived) cached total
-            total = _cached_total(where_sql, params)
+        if total_future is not None:
+            total = total_future.result()
+        total_capped = count_cap is not None and total > count_cap
+        if total_capped:
+            total = count_cap
     except sqlite3.Error:
         return templates.TemplateResponse(
             "gallery.html",
@@ -335,6 +692,7 @@ def gallery(
             "page": page,
             "page_size": page_size,
             "total": total,
+            "total_capped": total_capped,
             "sort": sort,
             "order": order.lower(),
             "year": year_norm,
@@ -343,6 +701,34 @@ def gallery(
         },
     )
 
+def _seek_time_buckets(cur: sqlite3.Cursor, col: str, lo: int, hi: int, unit: str) -> Optional[List[str]]:
+    """Distinct UTC years ('YYYY') or months ('MM') of ``col`` in [lo, hi), ascending.
+
+    Skip-scan over the column index: fetch the smallest value >= lo, record its
+    bucket, jump lo to the start of the next bucket, repeat. That is one index
+    seek per distinct year/month instead of strftime() on every row. Returns
+    None when a stored value is not a usable epoch (the caller then runs the
+    strftime query, which handles anything SQLite can).
+    """
+    sql = f"SELECT {col} FROM files WHERE {col} >= ? AND {col} < ? ORDER BY {col} LIMIT 1"
+    labels: List[str] = []
+    try:
+        while lo < hi:
+            row = cur.execute(sql, (lo, hi)).fetchone()
+            if row is None:
+                break
+            d = _dt.datetime.fromtimestamp(row[0], _dt.timezone.utc)
+            if unit == "year":
+                labels.append(f"{d.year:04d}")
+                lo = _cal.timegm((d.year + 1, 1, 1, 0, 0, 0))
+            else:
+                labels.append(f"{d.month:02d}")
+                y, m = (d.year + 1, 1) if d.month == 12 else (d.year, d.month + 1)
+                lo = _cal.timegm((y, m, 1, 0, 0, 0))
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+    return labels
+
 @app.get("/time_facets")
 def time_facets(column: str, year: Optional[str] = None):
     """Return distinct years (and months for a selected year) for a time column.
@@ -350,83 +736,305 @@ def time_facets(column: str, year: Optional[str] = None):
     column must be one of file_mtime | file_ctime. Returns JSON {years:[..], months:[..]}
     Months only returned (non-empty) if a specific year (not ALL/blank) is provided.
     """
-    col_map = {"file_mtime": "file_mtime", "file_ctime": "file_ctime"}
-    col = col_map.get(column)
+    col = _TIME_COLUMNS.get(column)
     if not col:
         raise HTTPException(status_code=400, detail="Invalid column")
+    year = year if year and year.upper() != 'ALL' else None
+    key = (col, year)
+    cache = app.state.facet_cache
+    hit = cache.get(key)
+    if hit and time.time() - hit[1] < FACET_CACHE_TTL:
+        return hit[0]
     years: List[str] = []
     months: List[str] = []
     try:
         with get_db_connection() as conn:
             cur = conn.cursor()
-            cur.execute(f"SELECT DISTINCT strftime('%Y', datetime({col}, 'unixepoch')) AS y FROM files WHERE {col} IS NOT NULL ORDER BY y DESC")
-            years = [r[0] for r in cur.fetchall() if r[0]]
-            if year and year.upper() != 'ALL':
-                cur.execute(
-                    f"SELECT DISTINCT strftime('%m', datetime({col}, 'unixepoch')) AS m FROM files WHERE {col} IS NOT NULL AND strftime('%Y', datetime({col}, 'unixepoch'))=? ORDER BY m ASC",
-                    (year,)
-                )
-                months = [r[0] for r in cur.fetchall() if r[0]]
+            seek_years = _seek_time_buckets(cur, col, -(2 ** 63), 2 ** 63 - 1, "year")
+            if seek_years is not None:
+                years = seek_years[::-1]
+            else:
+                cur.execute(f"SELECT DISTINCT strftime('%Y', datetime({col}, 'unixepoch')) AS y FROM files WHERE {col} IS NOT NULL ORDER BY y DESC")
+                years = [r[0] for r in cur.fetchall() if r[0]]
+            if year:
+                seek_months = None
+                if year.isdigit() and 1 <= int(year) < 9999:
+                    y = int(year)
+                    seek_months = _seek_time_buckets(cur, col, _cal.timegm((y, 1, 1, 0, 0, 0)), _cal.timegm((y + 1, 1, 1, 0, 0, 0)), "month")
+                if seek_months is not None:
+                    months = seek_months
+                else:
+                    cur.execute(
+                        f"SELECT DISTINCT strftime('%m', datetime({col}, 'unixepoch')) AS m FROM files WHERE {col} IS NOT NULL AND strftime('%Y', datetime({col}, 'unixepoch'))=? ORDER BY m ASC",
+                        (year,)
+                    )
+                    months = [r[0] for r in cur.fetchall() if r[0]]
     except sqlite3.Error:
-        pass
-    return {"years": years, "months": months}
+        return {"years": years, "months": months}  # not cached: retry next call
+    result = {"years": years, "months": months}
+    if len(cache) >= MAX_COUNT_CACHE_ENTRIES:
+        cache.clear()  # (column, year) keys are few; a full reset is enough
+    cache[key] = (result, time.time())
+    return result
+
+# Large metadata blobs (ComfyUI workflows run to tens of KB) are sent gzipped
+# to clients that accept it; below this size compression isn't worth the bytes.
+_GZIP_MIN_BYTES = 1024
+
+def _accepts_gzip(request: Request) -> bool:
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, q = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            return q.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
 
 @app.get("/metadata/{file_id}")
-def get_metadata(file_id: int):
-    """Return metadata_json for a file (fetched lazily for modal to avoid large page payloads)."""
+def get_metadata(file_id: int, request: Request):
+    """Return metadata_json for a file (fetched lazily for modal to avoid large page payloads).
+
+    Rows with a content hash get an ETag (hash + last_scanned, which changes
+    whenever indexing rewrites the row), so reopening a modal revalidates
+    with a body-less 304.
+    """
     try:
         with get_db_connection() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT metadata_json FROM files WHERE id=?", (file_id,))
+            cur.execute(_SQL_METADATA_BY_ID, (file_id,))
             row = cur.fetchone()
-            if not row:
-                raise HTTPException(status_code=404, detail="Not found")
-            return {"metadata_json": row["metadata_json"] or ''}
     except sqlite3.Error:
         raise HTTPException(status_code=500, detail="Database error")
+    if not row:
+        raise HTTPException(status_code=404, detail="Not found")
+    payload = {"metadata_json": row["metadata_json"] or ''}
+    gz = len(payload["metadata_json"]) >= _GZIP_MIN_BYTES and _accepts_gzip(request)
+    headers = {"Vary": "Accept-Encoding"} if gz else {}
+    if row["file_hash"]:
+        # Per-representation validator: the gzip body gets its own tag
+        etag = f'"m-{row["file_hash"]}-{row["last_scanned"]}{"-gz" if gz else ""}"'.replace(" ", "_")
+        headers.update({"ETag": etag, "Cache-Control": "no-cache"})
+        inm = request.headers.get("if-none-match")
+        if inm is not None and any(t.strip() in (etag, "W/" + etag, "*") for t in inm.split(",")):
+            return Response(status_code=304, headers=headers)
+    if not gz:
+        return _JSONResponseClass(payload, headers=headers)
+    body = orjson.dumps(payload) if orjson is not None else json.dumps(payload).encode()
+    headers["Content-Encoding"] = "gzip"
+    return Response(content=gzip.compress(body, compresslevel=6, mtime=0), media_type="application/json", headers=headers)
 
-@app.get("/image/{file_id}")
-def get_image(file_id: int, request: Request) -> FileResponse:
+class _ImageFileResponse(FileResponse):
+    """FileResponse streaming full-size images in 1 MiB chunks.
+
+    Starlette has no sendfile path here: each chunk is a threadpool read plus
+    an ASGI send, so the default 64 KiB means ~100 round trips for a 6 MB
+    PNG. Content-Length / Content-Type still come from the stat + extension.
+    """
+    chunk_size = 1024 * 1024
+
+def _stat_file(path: str) -> Optional[os.stat_result]:
+    """``os.stat`` for a regular file, else None (one syscall instead of isfile + stat)."""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT file_path FROM files WHERE id = ?", (file_id,))
-            row = cursor.fetchone()
-    except sqlite3.Error:
-        raise HTTPException(status_code=500, detail="Database error")
+        st = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    return st if stat.S_ISREG(st.st_mode) else None
 
-    if not row:
-        raise HTTPException(status_code=404, detail="Image not found")
+def _validators(st: os.stat_result, variant: str = "") -> Dict[str, str]:
+    """Strong ETag (mtime_ns + size [+ variant]) and Last-Modified for a file."""
+    etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}{variant}"'
+    return {"ETag": etag, "Last-Modified": formatdate(st.st_mtime, usegmt=True)}
 
-    file_path = row["file_path"]
-    if not os.path.isfile(file_path):
+def _not_modified(request: Request, validators: Dict[str, str], st: os.stat_result) -> bool:
+    """True when the client's cached copy is current (If-None-Match, else If-Modified-Since)."""
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        etag = validators["ETag"]
+        return any(t.strip() in (etag, "W/" + etag, "*") for t in inm.split(","))
+    ims = request.headers.get("if-modified-since")
+    if ims:
+        try:
+            return int(st.st_mtime) <= int(parsedate_to_datetime(ims).timestamp())
+        except (TypeError, ValueError, OverflowError):
+            return False
+    return False
+
+@app.get("/image/{file_id}")
+def get_image(file_id: int, request: Request) -> FileResponse:
+    file_path, _, cached = _lookup_file(file_id)
+    st = _stat_file(file_path)
+    if st is None and cached:
+        file_path, _, _ = _lookup_file(file_id, use_cache=False)
+        st = _stat_file(file_path)
+    if st is None:
         # Log warning about missing file if needed
         raise HTTPException(status_code=404, detail="File not found on disk")
 
     if 'v' in request.query_params:
         headers = {"Cache-Control": "public, max-age=31536000, immutable"}
     else:
-        headers = {"Cache-Control": "no-cache"}
-    return FileResponse(file_path, headers=headers)
+        headers = {"Cache-Control": "no-cache"}  # revalidate; answered with 304 while unchanged
+    headers.update(_validators(st))
+    if _not_modified(request, headers, st):
+        return Response(status_code=304, headers=headers)
+    return _ImageFileResponse(file_path, headers=headers, stat_result=st)
+
+def _render_thumb(fp: str, h: int) -> bytes:
+    """JPEG thumbnail bytes fitting (2h x h); libvips when installed, else Pillow."""
+    if _pyvips is not None:
+        try:
+            thumb = _pyvips.Image.thumbnail(fp, h * 2, height=h, size="down")
+            return thumb.jpegsave_buffer(Q=82, optimize_coding=True, strip=True)
+        except Exception:
+            pass  # format/mode libvips cannot handle: fall through to Pillow
+    with Image.open(fp) as im:
+        im.thumbnail((h * 2, h), Image.Resampling.LANCZOS)  # slight width bump to keep details
+        buf = BytesIO()
+        im.convert("RGB").save(buf, format="JPEG", quality=82, optimize=True)
+    return buf.getvalue()
+
+_HASH_UNSAFE_RE = re.compile(r"[^0-9A-Za-z]")
+
+def _thumb_cache_path(file_hash: Optional[str], h: int) -> Optional[str]:
+    """Cache file for a thumbnail, or None when caching is off or the hash is unknown."""
+    if not THUMB_CACHE_ENABLED or not file_hash:
+        return None
+    key = _HASH_UNSAFE_RE.sub("_", file_hash)  # e.g. 'b3:<hex>' -> 'b3_<hex>'
+    return os.path.join(THUMB_CACHE_DIR, key[-2:], f"{key}-{h}.jpg")
+
+def _store_thumb(path: str, data: bytes) -> None:
+    """Best-effort atomic write (temp file + rename): readers never see a partial JPEG."""
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return
+    _account_thumb(len(data))
+
+# Cache hits refresh the entry's mtime (the LRU clock) at most once a day, so a
+# hot thumbnail is not rewritten on every view.
+_THUMB_TOUCH_AFTER = 86400.0
+_thumb_cache_bytes: Optional[int] = None  # measured by the first prune
+_THUMB_BYTES_LOCK = threading.Lock()
+_THUMB_PRUNE_LOCK = threading.Lock()
+
+def _account_thumb(size: int) -> None:
+    global _thumb_cache_bytes
+    if not THUMB_CACHE_MAX_BYTES:
+        return
+    with _THUMB_BYTES_LOCK:
+        if _thumb_cache_bytes is not None:
+            _thumb_cache_bytes += size
+            over = _thumb_cache_bytes > THUMB_CACHE_MAX_BYTES
+        else:
+            over = True  # first write since startup: measure (and prune if needed)
+    if over:
+        _prune_thumb_cache()
+
+def _scan_thumb_cache() -> List[Tuple[float, int, str]]:
+    """``(mtime, size, path)`` of every cached thumbnail."""
+    entries: List[Tuple[float, int, str]] = []
+    try:
+        with os.scandir(THUMB_CACHE_DIR) as top:
+            subdirs = [d.path for d in top if d.is_dir(follow_symlinks=False)]
+    except OSError:
+        return entries
+    for sub in subdirs:
+        try:
+            with os.scandir(sub) as it:
+                for e in it:
+                    if e.name.endswith(".jpg"):
+                        try:
+                            st = e.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        entries.append((st.st_mtime, st.st_size, e.path))
+        except OSError:
+            continue
+    return entries
+
+def _prune_thumb_cache() -> None:
+    """Remove the oldest thumbnails until the cache is at 90% of its cap.
+
+    Runs on the encode thread that pushed the cache over the cap; concurrent
+    callers skip instead of scanning the folder twice.
+    """
+    global _thumb_cache_bytes
+    if not _THUMB_PRUNE_LOCK.acquire(blocking=False):
+        return
+    try:
+        entries = _scan_thumb_cache()
+        total = sum(size for _, size, _ in entries)
+        if total > THUMB_CACHE_MAX_BYTES:
+            target = THUMB_CACHE_MAX_BYTES * 9 // 10
+            entries.sort()
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    total -= size
+                except OSError:
+                    pass
+        with _THUMB_BYTES_LOCK:
+            _thumb_cache_bytes = total
+    finally:
+        _THUMB_PRUNE_LOCK.release()
+
+# Cache-miss encodes run on their own pool sized to the CPU count. Pillow and
+# libvips release the GIL while decoding/resampling, so threads scale across
+# cores, and a burst of misses queues here instead of pinning every worker
+# thread the other (DB-bound) endpoints share.
+_THUMB_WORKERS = os.cpu_count() or 4
+_THUMB_POOL: Optional[ThreadPoolExecutor] = None
+
+def _encode_thumb(fp: str, h: int, cache_path: Optional[str]) -> bytes:
+    data = _render_thumb(fp, h)
+    if cache_path:
+        _store_thumb(cache_path, data)
+    return data
 
 @app.get("/thumb/{file_id}")
-def get_thumbnail(file_id: int, request: Request, h: int = Query(default=256, ge=32, le=1024)):
+async def get_thumbnail(file_id: int, request: Request, h: int = Query(default=256, ge=32, le=1024)):
     """Return a downscaled JPEG thumbnail to speed up gallery loading.
 
     Height parameter controls size; width preserves aspect ratio. Cached for a year when hash provided.
     """
+    global _THUMB_POOL
+    plan = await run_in_threadpool(_plan_thumbnail, file_id, request, h)
+    if isinstance(plan, Response):
+        return plan
+    fp, st, headers, cache_path = plan
+    if _THUMB_POOL is None:
+        _THUMB_POOL = ThreadPoolExecutor(max_workers=_THUMB_WORKERS, thread_name_prefix="thumb")
+    # Best-effort thumbnailing
     try:
-        with get_db_connection() as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT file_path, file_hash FROM files WHERE id=?", (file_id,))
-            row = cur.fetchone()
-    except sqlite3.Error:
-        raise HTTPException(status_code=500, detail="Database error")
+        data = await asyncio.get_running_loop().run_in_executor(_THUMB_POOL, _encode_thumb, fp, h, cache_path)
+        return Response(content=data, media_type="image/jpeg", headers=headers)
+    except Exception:
+        # Fallback to original delivery, reusing the row and stat already in hand
+        headers.update(_validators(st))
+        return _ImageFileResponse(fp, headers=headers, stat_result=st)
 
-    if not row:
-        raise HTTPException(status_code=404, detail="Image not found")
-    fp = row["file_path"]
-    if not os.path.isfile(fp):
+def _plan_thumbnail(file_id: int, request: Request, h: int):
+    """Blocking part of /thumb: row lookup, stat and cache probes.
+
+    Returns a finished Response (304, cached file, placeholder) or the
+    ``(file_path, stat, headers, cache_path)`` needed to encode one.
+    """
+    fp, file_hash, cached = _lookup_file(file_id)
+    st = _stat_file(fp)
+    if st is None and cached:
+        fp, file_hash, _ = _lookup_file(file_id, use_cache=False)
+        st = _stat_file(fp)
+    if st is None:
         # Serve placeholder (optional) instead of noisy 404s which spam logs & trigger many network errors
         if PLACEHOLDER_ON_MISSING:
             ph_png = os.path.join(BASE_DIR, "static", "placeholder.png")
@@ -438,79 +1046,365 @@ def get_thumbnail(file_id: int, request: Request, h: int = Query(default=256, ge
                 media_type = "image/png" if ph.endswith('.png') else "image/svg+xml"
                 return FileResponse(ph, media_type=media_type, headers=headers)
         raise HTTPException(status_code=404, detail="File not found on disk")
-    # Best-effort thumbnailing
-    try:
-        with Image.open(fp) as im:
-            im.thumbnail((h * 2, h), Image.Resampling.LANCZOS)  # slight width bump to keep details
-            buf = BytesIO()
-            im.convert("RGB").save(buf, format="JPEG", quality=82, optimize=True)
-            buf.seek(0)
-        headers = {"Cache-Control": "public, max-age=31536000, immutable"} if row["file_hash"] else {"Cache-Control": "no-cache"}
-        return Response(content=buf.getvalue(), media_type="image/jpeg", headers=headers)
-    except Exception:
-        # Fallback to original delivery
-        return get_image(file_id, request)
+    headers = {"Cache-Control": "public, max-age=31536000, immutable"} if file_hash else {"Cache-Control": "no-cache"}
+    headers.update(_validators(st, f"-t{h}"))
+    # Unchanged source + same size => the client's thumbnail is current; skip decoding entirely
+    if _not_modified(request, headers, st):
+        return Response(status_code=304, headers=headers)
+    cache_path = _thumb_cache_path(file_hash, h)
+    if cache_path:
+        cached = _stat_file(cache_path)
+        if cached is not None:
+            if THUMB_CACHE_MAX_BYTES and time.time() - cached.st_mtime > _THUMB_TOUCH_AFTER:
+                try:
+                    os.utime(cache_path)  # mark recently used for _prune_thumb_cache
+                except OSError:
+                    pass
+            return FileResponse(cache_path, media_type="image/jpeg", headers=headers, stat_result=cached)
+    return fp, st, headers, cache_path
 
 import shutil
 
+# Same 500-row sample as the Python fallback; invalid/non-object JSON is swapped
+# for '{}' so one bad row cannot abort json_each for the whole query.
+_SQL_METADATA_KEYS_JSON1 = """
+    SELECT DISTINCT j.key FROM (
+        SELECT metadata_json FROM files WHERE metadata_json IS NOT NULL AND metadata_json != '' LIMIT 500
+    ) f, json_each(CASE WHEN json_valid(f.metadata_json) AND json_type(f.metadata_json) = 'object'
+                        THEN f.metadata_json ELSE '{}' END) j
+    WHERE length(j.key) <= 64
+"""
+
+def _has_json1(cur: sqlite3.Cursor) -> bool:
+    """Whether this SQLite build has the JSON1 functions (probed once, cached on app.state)."""
+    has = getattr(app.state, 'has_json1', None)
+    if has is None:
+        try:
+            cur.execute("SELECT json_type('{}')")
+            has = True
+        except sqlite3.Error:
+            has = False
+        app.state.has_json1 = has  # type: ignore[attr-defined]
+    return has
+
 @app.get("/metadata_fields")
 def metadata_fields():
     """Return distinct top-level JSON keys observed in metadata_json.
 
-    This is a heuristic (simple JSON_EXTRACT on first level keys) and may
-    return duplicates if JSON1 extension is not available; if JSON1 is
-    missing we just return an empty list gracefully.
+    Samples the first 500 rows with metadata. With JSON1 (built into modern
+    SQLite) the keys are walked by ``json_each`` in C and de-duplicated by
+    DISTINCT; otherwise each blob is parsed in Python. Non-object or invalid
+    JSON contributes no keys either way. Results are cached like the time
+    facets (FACET_CACHE_TTL, cleared by file operations).
     """
+    hit = app.state.fields_cache
+    if hit and time.time() - hit[1] < FACET_CACHE_TTL:
+        return list(hit[0])
     try:
         with get_db_connection() as conn:
             cur = conn.cursor()
-            # Attempt: parse keys by simple regex on stored JSON strings (fallback)
-            cur.execute("SELECT metadata_json FROM files WHERE metadata_json IS NOT NULL AND metadata_json != '' LIMIT 500")
-            keys = set()
-            import json as _json
-            for (mj,) in cur.fetchall():
-                if not mj:
-                    continue
-                try:
-                    obj = _json.loads(mj)
-                    if isinstance(obj, dict):
-                        for k in obj.keys():
-                            if isinstance(k, str) and len(k) <= 64:
-                                keys.add(k)
-                except Exception:
-                    continue
-            return sorted(keys)
+            if _has_json1(cur):
+                cur.execute(_SQL_METADATA_KEYS_JSON1)
+                keys = sorted(r[0] for r in cur.fetchall())
+            else:
+                keys = _metadata_keys_python(cur)
     except sqlite3.Error:
         return []
+    app.state.fields_cache = (keys, time.time())
+    return list(keys)
+
+def _json_loads(text: str) -> Any:
+    """orjson when installed, stdlib json for anything it rejects (NaN, huge ints)."""
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
+def _metadata_keys_python(cur: sqlite3.Cursor) -> List[str]:
+    """JSON1-less fallback for metadata_fields: parse the sampled blobs in Python."""
+    cur.execute("SELECT metadata_json FROM files WHERE metadata_json IS NOT NULL AND metadata_json != '' LIMIT 500")
+    keys = set()
+    loads = _json_loads
+    for (mj,) in cur.fetchall():
+        if not mj:
+            continue
+        try:
+            obj = loads(mj)
+            if isinstance(obj, dict):
+                for k in obj.keys():
+                    if isinstance(k, str) and len(k) <= 64:
+                        keys.add(k)
+        except Exception:
+            continue
+    return sorted(keys)
+
+def _execute_matching_ids(conn: sqlite3.Connection, where_sql: str, params: list, cap: int) -> sqlite3.Cursor:
+    cur = conn.cursor()
+    # Plain tuples for this cursor only: no sqlite3.Row wrapper per id
+    cur.row_factory = None
+    # Fetch one past the cap to detect truncation without reading every match
+    if where_sql:
+        cur.execute(f"SELECT id FROM files WHERE {where_sql} LIMIT ?", params + [cap + 1])
+    else:
+        cur.execute(_SQL_ALL_IDS_LIMIT, (cap + 1,))
+    return cur
+
+def _stream_matching_ids(where_sql: str, params: list, cap: int) -> StreamingResponse:
+    """One id per line, fetched in batches while the response is written.
+
+    The statement runs before the response starts so query errors still map
+    to a 500. The leased connection goes back to the pool exactly once: when
+    the stream ends, from the response's background task (which also runs
+    after a client disconnect), or when a never-sent response's generator is
+    garbage collected. Truncation is only known at the end, so it arrives as
+    a trailing ``{"truncated":true}`` line instead of a header.
+    """
+    lease = get_db_connection()
+    conn = lease.__enter__()
+    try:
+        cur = _execute_matching_ids(conn, where_sql, params, cap)
+    except sqlite3.Error:
+        lease.__exit__(*sys.exc_info())
+        raise HTTPException(status_code=500, detail="Database error")
+    # Fetches and the release share a lock, so the connection is never handed
+    # back to the pool while a fetch is still running on a worker thread.
+    lock = threading.Lock()
+    released = False
+
+    def _release(exc_info=(None, None, None)) -> None:
+        nonlocal released
+        with lock:
+            if released:
+                return
+            released = True
+            cur.close()
+            lease.__exit__(*exc_info)
+
+    def _lines():
+        exc_info = (None, None, None)
+        try:
+            yield b""  # primed below, so the finally is armed before the response exists
+            left = cap
+            while left:
+                with lock:
+                    if released:
+                        return
+                    rows = cur.fetchmany(min(2000, left))
+                if not rows:
+                    return
+                left -= len(rows)
+                yield b"".join(b"%d\n" % i for (i,) in rows)
+            with lock:
+                truncated = not released and cur.fetchone() is not None
+            if truncated:
+                yield b'{"truncated":true}\n'
+        except BaseException:
+            exc_info = sys.exc_info()
+            raise
+        finally:
+            _release(exc_info)
+
+    lines = _lines()
+    next(lines)
+    return StreamingResponse(lines, media_type="application/x-ndjson", background=BackgroundTask(_release))
 
 @app.get("/matching_ids")
 def matching_ids(
     search: str = "",
     logics: Optional[List[str]] = Query(default=[]),
     values: Optional[List[str]] = Query(default=[]),
+    fmt: str = Query(default="json", alias="format"),  # json | bin | ndjson
 ):
-    has_fts = ensure_fts_flag()
+    has_fts = _fts_for(search, values)
     try:
         where_sql, params = build_where(search, logics or [], values or [], has_fts)
     except SearchBuildError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    # Soft cap response size to mitigate over-large payloads (warn via truncation)
+    MAX_IDS = 100_000
+    if fmt == "ndjson":
+        return _stream_matching_ids(where_sql, params, MAX_IDS)
     try:
         with get_db_connection() as conn:
-            cur = conn.cursor()
-            if where_sql:
-                cur.execute(f"SELECT id FROM files WHERE {where_sql}", params)
-            else:
-                cur.execute("SELECT id FROM files")
-            ids = [row["id"] for row in cur.fetchall()]
+            cur = _execute_matching_ids(conn, where_sql, params, MAX_IDS)
+            ids = [i for (i,) in cur.fetchall()]
     except sqlite3.Error:
         raise HTTPException(status_code=500, detail="Database error")
-    # Soft cap response size to mitigate over-large payloads (warn via truncation)
-    MAX_IDS = 100_000
-    truncated = False
-    if len(ids) > MAX_IDS:
-        ids = ids[:MAX_IDS]
-        truncated = True
-    return {"ids": ids, "truncated": truncated}
+    truncated = len(ids) > MAX_IDS
+    if truncated:
+        del ids[MAX_IDS:]
+    if fmt == "bin":
+        # Packed little-endian int64 ids (read as BigInt64Array); 8 bytes per id, no encoder
+        packed = array("q", ids)
+        if sys.byteorder != "little":
+            packed.byteswap()
+        return Response(
+            content=packed.tobytes(),
+            media_type="application/octet-stream",
+            headers={"X-Truncated": "1" if truncated else "0"},
+        )
+    # Serialize directly: FastAPI's jsonable_encoder walks every int of the list
+    payload = {"ids": ids, "truncated": truncated}
+    if orjson is not None:
+        return Response(content=orjson.dumps(payload), media_type="application/json")
+    return Response(content=json.dumps(payload, separators=(",", ":")), media_type="application/json")
+
+# Filesystem side of file operations runs on a small shared pool so per-file
+# syscalls (slow on network/USB storage) overlap instead of queueing.
+_FS_WORKERS = 8
+_FS_POOL: Optional[ThreadPoolExecutor] = None
+
+_COPY_FILE_RANGE = getattr(os, "copy_file_range", None)  # Linux only
+# errnos meaning "copy_file_range can't do this pair of files": fall back to user space
+_CFR_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL, errno.EBADF, errno.ETXTBSY}
+
+def _copy_file(src: str, dst: str) -> None:
+    """``shutil.copy2`` equivalent that asks the kernel to copy the data.
+
+    ``copy_file_range`` lets Btrfs/XFS share extents (reflink: no bytes are
+    read or written) and NFS 4.2 copy server-side; on other filesystems it is
+    an in-kernel copy, like the sendfile path copy2 already uses. Where it is
+    unavailable or refused, the rest is copied with copyfileobj. Data first,
+    then mode/times via copystat, as copy2 does.
+    """
+    if _COPY_FILE_RANGE is None:
+        shutil.copy2(src, dst)
+        return
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        copied = 0
+        try:
+            while copied < size:
+                n = _COPY_FILE_RANGE(fsrc.fileno(), fdst.fileno(), size - copied)  # advances both offsets
+                if n == 0:
+                    break
+                copied += n
+        except OSError as e:
+            if copied or e.errno not in _CFR_UNSUPPORTED:
+                raise
+        shutil.copyfileobj(fsrc, fdst, 1024 * 1024)  # remainder (all of it if refused up front)
+    shutil.copystat(src, dst)
+
+def _fs_apply(operation: str, src: str, target: Optional[str], missing_ok: bool) -> None:
+    # EAFP: no stat before each op; a missing source only surfaces as FileNotFoundError.
+    # Move/copy targets are placeholders reserved by _safe_collision_path, so
+    # they are overwritten in place (os.replace) and removed again on failure.
+    try:
+        if operation == 'delete':
+            os.remove(src)
+        elif operation == 'move':
+            try:
+                os.replace(src, target)  # same filesystem: one inode rename, no isdir() probe
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                shutil.move(src, target, copy_function=_copy_file)  # across devices: copy + unlink
+        else:
+            _copy_file(src, target)
+    except FileNotFoundError:
+        if operation == 'delete':
+            return  # already gone; the row is still removed
+        _drop_placeholder(target)
+        if missing_ok and not os.path.exists(src):
+            return  # row is still re-pointed/copied (background jobs keep the DB in step)
+        raise
+    except Exception:
+        if operation != 'delete':
+            _drop_placeholder(target)
+        elif not os.path.isfile(src):
+            # Not a regular file (e.g. a directory now sits at the path: IsADirectoryError,
+            # or PermissionError on macOS): skip it and still remove the row, as before
+            return
+        raise
+
+def _drop_placeholder(target: Optional[str]) -> None:
+    if target:
+        try:
+            os.remove(target)
+        except OSError:
+            pass
+
+def _run_fs_ops(operation: str, planned: Sequence[Tuple[int, str, Optional[str]]], missing_ok: bool = False) -> List[Optional[Exception]]:
+    """Run ``(file_id, src, target)`` filesystem ops; returns one exception-or-None per item, in order."""
+    global _FS_POOL
+    def one(item: Tuple[int, str, Optional[str]]) -> Optional[Exception]:
+        try:
+            _fs_apply(operation, item[1], item[2], missing_ok)
+            return None
+        except Exception as e:  # per-file error; reported by the caller
+            return e
+    if len(planned) < 2:
+        return [one(item) for item in planned]
+    if _FS_POOL is None:
+        _FS_POOL = ThreadPoolExecutor(max_workers=_FS_WORKERS, thread_name_prefix="file-op")
+    return list(_FS_POOL.map(one, planned))
+
+# File operations only read (id, file_path); copies duplicate the rest of the
+# row in SQL (_SQL_COPY_ROW).
+_FILE_OP_COLS = "id, file_path"
+
+@lru_cache(maxsize=8)
+def _sql_file_op_rows(n: int) -> str:
+    """``SELECT id, file_path ... WHERE id IN (?, ...)`` for ``n`` ids (full batches reuse one string)."""
+    return f"SELECT {_FILE_OP_COLS} FROM files WHERE id IN ({','.join('?' * n)})"
+
+_SQL_MOVE_ROW = "UPDATE files SET file_path=? WHERE id=?"
+# Copies duplicate the source row inside SQLite: hash, metadata_json (often the
+# largest column) and stats never round-trip through Python. Same (path, id)
+# params as a move.
+_SQL_COPY_ROW = """
+    INSERT INTO files (file_path, file_hash, metadata_json, last_scanned, file_size, file_mtime, file_ctime, width, height)
+    SELECT ?, file_hash, metadata_json, CURRENT_TIMESTAMP, file_size, file_mtime, file_ctime, width, height
+    FROM files WHERE id = ?
+    ON CONFLICT(file_path) DO NOTHING
+"""
+
+# One in-process writer at a time: file-operation batches take this lock around
+# their write transaction, so concurrent requests/jobs queue here instead of
+# spinning in SQLite's busy handler. Filesystem work happens outside it.
+_WRITE_LOCK = threading.Lock()
+
+def _apply_file_changes(conn: sqlite3.Connection, operation: str, staged: List[Tuple[int, Any]]) -> Tuple[int, List[str]]:
+    """Write one batch of staged DB changes; returns (rows affected, error strings).
+
+    ``staged`` holds ``(row_id, params)`` pairs collected while the filesystem
+    work ran: ``(target, id)`` for move and copy, the id for delete. Moves/copies go through one ``executemany`` and deletes through a
+    single ``DELETE ... IN``. If the batched statement fails (e.g. a UNIQUE
+    clash on one target path) the savepoint is rolled back and the batch is
+    replayed row by row so only the offending items are reported. Callers
+    hold ``_WRITE_LOCK`` through the commit.
+    """
+    if not staged:
+        return 0, []
+    cur = conn.cursor()
+    if not conn.in_transaction:
+        # Take the write lock up front so contention shows here, not mid-batch
+        cur.execute("BEGIN IMMEDIATE")
+    cur.execute("SAVEPOINT file_changes")
+    try:
+        if operation == 'delete':
+            ids = [rid for rid, _ in staged]
+            cur.execute(f"DELETE FROM files WHERE id IN ({','.join('?' * len(ids))})", ids)
+        else:
+            cur.executemany(_SQL_MOVE_ROW if operation == 'move' else _SQL_COPY_ROW, [p for _, p in staged])
+        affected = cur.rowcount
+        cur.execute("RELEASE file_changes")
+        return affected, []
+    except sqlite3.Error:
+        cur.execute("ROLLBACK TO file_changes")
+        cur.execute("RELEASE file_changes")
+    sql = {'move': _SQL_MOVE_ROW, 'copy': _SQL_COPY_ROW, 'delete': "DELETE FROM files WHERE id=?"}[operation]
+    affected = 0
+    errors: List[str] = []
+    for rid, params in staged:
+        try:
+            cur.execute(sql, params)
+            affected += cur.rowcount
+        except sqlite3.Error as e:
+            errors.append(f"{operation} error for id {rid}: {e}")
+    return affected, errors
 
 @app.post("/file_operation")
 def file_operation(
@@ -551,80 +1445,46 @@ def file_operation(
     try:
         with get_db_connection() as conn:
             cur = conn.cursor()
+            cur.row_factory = None  # plain (id, file_path) tuples, unpacked below
             for i in range(0, len(ids), BATCH):
                 batch_ids = ids[i:i + BATCH]
-                placeholders = ','.join(['?'] * len(batch_ids))
-                # When copying we need all columns; otherwise minimal for speed
-                if operation == 'copy':
-                    cur.execute(
-                        f"SELECT id, file_path, file_hash, metadata_json, file_size, file_mtime, file_ctime, width, height FROM files WHERE id IN ({placeholders})",
-                        batch_ids,
-                    )
-                else:
-                    cur.execute(
-                        f"SELECT id, file_path FROM files WHERE id IN ({placeholders})",
-                        batch_ids,
-                    )
+                cur.execute(_sql_file_op_rows(len(batch_ids)), batch_ids)
                 rows = cur.fetchall()
-                for row in rows:
-                    try:
-                        src = row["file_path"]
-                        src_abs = _canonical_path(src)
-                        if not _is_under_allowed(src_abs):
-                            errors.append(f"Outside allowed root: {src}")
-                            continue
-                        if operation in {"move", "copy"}:
-                            assert dest_abs is not None
-                            base_name = os.path.basename(src)
-                            target = os.path.join(dest_abs, base_name)
-                            # Collision-safe naming
-                            if os.path.exists(target):
-                                stem, ext = os.path.splitext(base_name)
-                                counter = 1
-                                while os.path.exists(target):
-                                    target = os.path.join(dest_abs, f"{stem}_{counter}{ext}")
-                                    counter += 1
-                            if operation == 'move':
-                                shutil.move(src, target)
-                                cur.execute("UPDATE files SET file_path=? WHERE id=?", (target, row['id']))
-                                moved += 1
-                            else:  # copy
-                                shutil.copy2(src, target)
-                                # Insert new row duplicating metadata (fast path: reuse hash & metadata)
-                                now_ts = int(time.time())
-                                # Attempt to preserve times/size if available
-                                cur.execute(
-                                    """
-                                    INSERT INTO files (file_path, file_hash, metadata_json, last_scanned, file_size, file_mtime, file_ctime, width, height)
-                                    VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?, ?, ?, ?, ?)
-                                    ON CONFLICT(file_path) DO NOTHING
-                                    """,
-                                    (
-                                        target,
-                                        row['file_hash'] if 'file_hash' in row.keys() else None,
-                                        row['metadata_json'] if 'metadata_json' in row.keys() else None,
-                                        row['file_size'] if 'file_size' in row.keys() else None,
-                                        row['file_mtime'] if 'file_mtime' in row.keys() else None,
-                                        row['file_ctime'] if 'file_ctime' in row.keys() else None,
-                                        row['width'] if 'width' in row.keys() else None,
-                                        row['height'] if 'height' in row.keys() else None,
-                                    ),
-                                )
-                                # Only count as copied if DB insert actually succeeded
-                                if cur.rowcount > 0:
-                                    copied += 1
-                        elif operation == 'delete':
-                            if os.path.isfile(src):
-                                try:
-                                    os.remove(src)
-                                except FileNotFoundError:
-                                    pass
-                            cur.execute("DELETE FROM files WHERE id=?", (row['id'],))
-                            deleted += 1
-                    except Exception as fe:  # per-file error; continue
-                        errors.append(f"{operation} error for id {row['id']}: {fe}")
-                # Commit per batch to release locks & ensure FTS triggers fire progressively
-                conn.commit()
+                # Plan targets in order (collision-safe within the batch), run the
+                # filesystem ops concurrently, then stage the matching DB writes and
+                # apply them once per batch (executemany / DELETE ... IN) below.
+                planned: List[Tuple[int, str, Optional[str]]] = []
+                taken = _dir_names(dest_abs) if dest_abs else set()
+                for file_id, src in rows:
+                    if not _validate_allowed(src):
+                        errors.append(f"Outside allowed root: {src}")
+                        continue
+                    target = None
+                    if operation in {"move", "copy"}:
+                        assert dest_abs is not None
+                        target = _safe_collision_path(dest_abs, os.path.basename(src), taken)
+                    planned.append((file_id, src, target))
+                staged: List[Tuple[int, Any]] = []
+                for (file_id, src, target), fe in zip(planned, _run_fs_ops(operation, planned)):
+                    if fe is not None:
+                        errors.append(f"{operation} error for id {file_id}: {fe}")
+                    elif operation in {'move', 'copy'}:
+                        # Copy: new row duplicating the source's hash & metadata (in SQL)
+                        staged.append((file_id, (target, file_id)))
+                    else:
+                        staged.append((file_id, (file_id,)))
+                with _WRITE_LOCK:
+                    affected, db_errors = _apply_file_changes(conn, operation, staged)
+                    # Commit per batch to release locks & ensure FTS triggers fire progressively
+                    conn.commit()
+                errors.extend(db_errors)
+                # Copies only count when the insert actually happened (ON CONFLICT DO NOTHING)
+                if operation == 'move':
+                    moved += affected
+                elif operation == 'copy':
+                    copied += affected
+                else:
+                    deleted += affected
     except HTTPException:
         raise
     except Exception as e:
@@ -654,7 +1514,7 @@ def matching_count(
     year: str = Query(default=""),
     month: str = Query(default=""),
 ):
-    has_fts = ensure_fts_flag()
+    has_fts = _fts_for(search, values)
     try:
         where_sql, params = build_where(search, logics or [], values or [], has_fts)
     except SearchBuildError as e:
@@ -664,31 +1524,46 @@ def matching_count(
     total = _cached_total(where_sql, params)
     return {"total": total}
 
+# All four scalar aggregates in one statement: one prepare/step per request
+_SQL_EXTRACTION_COUNTS = """
+    SELECT (SELECT COUNT(*) FROM files), (SELECT COUNT(*) FROM models),
+           (SELECT COUNT(*) FROM models WHERE lora_count>0),
+           (SELECT COUNT(DISTINCT lora_name) FROM lora_usages)
+"""
+_SQL_TOP_LORAS = "SELECT lora_name, COUNT(*) c FROM lora_usages GROUP BY lora_name ORDER BY c DESC LIMIT 20"
+
 @app.get("/extraction_summary")
 def extraction_summary():
-    """Return aggregate extraction stats (counts + top LoRA)."""
+    """Return aggregate extraction stats (counts + top LoRA).
+
+    Cached like the facets (FACET_CACHE_TTL): extraction runs in the indexer
+    process, and file operations clear the cache.
+    """
+    hit = app.state.summary_cache
+    if hit is not None and time.time() - hit[1] < FACET_CACHE_TTL:
+        return hit[0]
     try:
         with get_db_connection() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT COUNT(*) FROM files")
-            files = cur.fetchone()[0]
-            cur.execute("SELECT COUNT(*) FROM models")
-            models = cur.fetchone()[0]
-            cur.execute("SELECT COUNT(*) FROM models WHERE lora_count>0")
-            with_lora = cur.fetchone()[0]
-            cur.execute("SELECT COUNT(DISTINCT lora_name) FROM lora_usages")
-            distinct_loras = cur.fetchone()[0]
-            cur.execute("SELECT lora_name, COUNT(*) c FROM lora_usages GROUP BY lora_name ORDER BY c DESC LIMIT 20")
-            top = [{'name': r[0], 'count': r[1]} for r in cur.fetchall()]
-            return {
-                'files': files,
-                'models': models,
-                'with_lora': with_lora,
-                'distinct_loras': distinct_loras,
-                'top_loras': top
-            }
+            files, models, with_lora, distinct_loras = cur.execute(_SQL_EXTRACTION_COUNTS).fetchone()
+            top = [{'name': r[0], 'count': r[1]} for r in cur.execute(_SQL_TOP_LORAS).fetchall()]
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=f'Database error: {e}')
+    result = {
+        'files': files,
+        'models': models,
+        'with_lora': with_lora,
+        'distinct_loras': distinct_loras,
+        'top_loras': top
+    }
+    app.state.summary_cache = (result, time.time())  # type: ignore[attr-defined]
+    return result
+
+# Background file-operation jobs run on a small bounded pool instead of a
+# thread per request: writes are serialized by _WRITE_LOCK anyway, so extra
+# jobs just wait in the queue rather than each holding a pooled connection.
+_JOB_WORKERS = 4
+_JOB_POOL: Optional[ThreadPoolExecutor] = None
 
 @app.post("/file_operation_async")
 def start_file_operation_async(
@@ -707,17 +1582,17 @@ def start_file_operation_async(
         if not destination or not os.path.isdir(destination):
             raise HTTPException(status_code=400, detail="Invalid destination folder")
         dest_abs = _canonical_path(destination)
-        if not _validate_allowed(dest_abs):
+        if not _is_under_allowed(dest_abs):
             raise HTTPException(status_code=400, detail="Destination outside allowed roots")
 
     job_id = uuid.uuid4().hex
-    with app.state.jobs_lock:  # type: ignore[attr-defined]
-        app.state.jobs[job_id] = {
+    now = time.time()
+    job: Dict[str, Any] = {
         "id": job_id,
         "operation": operation,
         "status": "pending",
-        "started": time.time(),
-        "updated": time.time(),
+        "started": now,
+        "updated": now,
         "processed": 0,
         "total": None,
         "counts": {"moved": 0, "copied": 0, "deleted": 0},
@@ -727,9 +1602,12 @@ def start_file_operation_async(
         "destination": dest_abs,
         "duration_sec": None,
     }
+    jobs = app.state.jobs  # type: ignore[attr-defined]
+    with app.state.jobs_lock:  # type: ignore[attr-defined]
+        _prune_jobs(jobs, now)
+        jobs[job_id] = job
 
-    def runner():  # background processing
-        job = app.state.jobs[job_id]
+    def runner():  # background processing; updates the job dict it closes over
         job['status'] = 'running'
         try:
             if scope['type'] == 'ids':
@@ -748,7 +1626,7 @@ def start_file_operation_async(
                 exclusions = scope.get('excluded', []) or []
                 if exclusions and not all(isinstance(x, int) for x in exclusions):
                     raise ValueError("Excluded must be list[int]")
-                has_fts = ensure_fts_flag()
+                has_fts = _fts_for(search, values)
                 where_sql, params = build_where(search, logics, values, has_fts)
                 where_sql, params, _, _ = _apply_time_filter(where_sql, params, sort, year, month)
                 # Determine total upfront (minus exclusions that may exist in result set)
@@ -761,14 +1639,50 @@ def start_file_operation_async(
             job['errors'].append(str(e))
             job['error_count'] += 1
         finally:
+            # Once per job (even a failed one may have changed rows), not per batch
+            _invalidate_count_cache()
             job['updated'] = time.time()
             start = job.get('started')
             if start:
                 job['duration_sec'] = round(time.time() - start, 3)
 
-    threading.Thread(target=runner, daemon=True).start()
+    global _JOB_POOL
+    if _JOB_POOL is None:
+        _JOB_POOL = ThreadPoolExecutor(max_workers=_JOB_WORKERS, thread_name_prefix="file-job")
+    _JOB_POOL.submit(runner)  # stays 'pending' until a worker is free
     return {"job_id": job_id}
 
+def _shutdown_job_pool() -> None:
+    # Drop queued jobs on server shutdown; running ones finish their current work
+    global _JOB_POOL
+    pool, _JOB_POOL = _JOB_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+app.router.on_shutdown.append(_shutdown_job_pool)
+
+# Finished jobs are kept for status polling, but bounded: drop them after
+# JOB_RETENTION_SEC, and beyond MAX_JOBS drop the least recently polled ones.
+# Pending/running jobs are never evicted.
+MAX_JOBS = 256
+JOB_RETENTION_SEC = 3600.0
+
+def _prune_jobs(jobs: "OrderedDict[str, Dict[str, Any]]", now: float) -> None:
+    """Evict finished jobs (caller holds jobs_lock)."""
+    finished = [jid for jid, job in jobs.items() if job['status'] in ('completed', 'failed')]
+    for jid in finished:
+        if now - (jobs[jid].get('updated') or 0) > JOB_RETENTION_SEC:
+            del jobs[jid]
+    excess = len(jobs) + 1 - MAX_JOBS  # room for the job about to be added
+    for jid in finished:
+        if excess <= 0:
+            break
+        if jid in jobs:
+            del jobs[jid]
+            excess -= 1
+
+_MAX_JOB_ERRORS = 50
+
 def _process_ids_sync(ids: List[int], operation: str, dest_abs: Optional[str], job: Dict[str, Any], async_mode: bool = False):
     # Reuse existing chunked logic but update job state
     BATCH = 500
@@ -777,12 +1691,10 @@ def _process_ids_sync(ids: List[int], operation: str, dest_abs: Optional[str], j
     try:
         with get_db_connection() as conn:
             cur = conn.cursor()
+            cur.row_factory = None  # _process_rows unpacks (id, file_path) tuples
             for i in range(0, len(ids), BATCH):
                 batch_ids = ids[i:i + BATCH]
-                placeholders = ','.join(['?'] * len(batch_ids))
-                need_full = operation == 'copy'
-                select_cols = "id, file_path, file_hash, metadata_json, file_size, file_mtime, file_ctime, width, height" if need_full else "id, file_path"
-                cur.execute(f"SELECT {select_cols} FROM files WHERE id IN ({placeholders})", batch_ids)
+                cur.execute(_sql_file_op_rows(len(batch_ids)), batch_ids)
                 rows = cur.fetchall()
                 _process_rows(rows, operation, dest_abs, conn, job)
                 job['updated'] = time.time()
@@ -795,40 +1707,45 @@ def _process_query_scope(where_sql: str, params: List[Any], operation: str, dest
     total = job.get('total') or 0
     exclusion_set = set(exclusions or [])
     debug_logged = False
-    # Capture the current maximum id BEFORE we start modifying the table (important for copy operations
-    # which insert new rows; we don't want to repeatedly process newly inserted copies).
-    try:
-        with get_db_connection() as _conn_max:
-            curm = _conn_max.cursor()
-            curm.execute("SELECT COALESCE(MAX(id),0) FROM files")
-            original_max_id = curm.fetchone()[0]
-    except sqlite3.Error:
-        original_max_id = None  # fallback: process until natural exhaustion (legacy behavior)
     try:
         with get_db_connection() as conn:
             cur = conn.cursor()
+            cur.row_factory = None  # _process_rows unpacks (id, file_path) tuples
+            # Capture the current maximum id BEFORE we start modifying the table (important for copy operations
+            # which insert new rows; we don't want to repeatedly process newly inserted copies).
+            try:
+                cur.execute("SELECT COALESCE(MAX(id),0) FROM files")
+                original_max_id = cur.fetchone()[0]
+            except sqlite3.Error:
+                original_max_id = None  # fallback: process until natural exhaustion (legacy behavior)
+            # Exclusions go into the query as one JSON array (json_each) so every
+            # batch comes back full; Python filtering is only the JSON1-less fallback.
+            excl_in_sql = bool(exclusion_set) and _has_json1(cur)
+            # Incremental keyset query, composed once: every batch binds only a new
+            # last_id, so the SQL text (and its cached prepared statement) never changes.
+            max_id_clause = " AND id <= ?" if original_max_id is not None else ""
+            excl_clause = " AND id NOT IN (SELECT value FROM json_each(?))" if excl_in_sql else ""
+            filter_clause = f"({where_sql}) AND " if where_sql else ""
+            query = f"SELECT {_FILE_OP_COLS} FROM files WHERE {filter_clause}id > ?{max_id_clause}{excl_clause} ORDER BY id LIMIT ?"
+            # One parameter list for the whole job; each batch only overwrites the last_id slot
+            bound: List[Any] = list(params) if where_sql else []
+            last_id_slot = len(bound)
+            bound.append(last_id)
+            if original_max_id is not None:
+                bound.append(original_max_id)
+            if excl_in_sql:
+                bound.append(json.dumps(sorted(exclusion_set)))
+            bound.append(BATCH)
+            py_exclusions = None if excl_in_sql else exclusion_set
             while True:
-                # Build incremental query
-                max_id_clause = " AND id <= ?" if original_max_id is not None else ""
-                if where_sql:
-                    query = f"SELECT id, file_path, file_hash, metadata_json, file_size, file_mtime, file_ctime, width, height FROM files WHERE ({where_sql}) AND id > ?{max_id_clause} ORDER BY id LIMIT ?"
-                    execute_params = params + [last_id]
-                    if original_max_id is not None:
-                        execute_params.append(original_max_id)
-                    execute_params.append(BATCH)
-                    cur.execute(query, execute_params)
-                else:
-                    base = f"SELECT id, file_path, file_hash, metadata_json, file_size, file_mtime, file_ctime, width, height FROM files WHERE id > ?{max_id_clause} ORDER BY id LIMIT ?"
-                    if original_max_id is not None:
-                        cur.execute(base, (last_id, original_max_id, BATCH))
-                    else:
-                        cur.execute(base, (last_id, BATCH))
+                bound[last_id_slot] = last_id
+                cur.execute(query, bound)
                 rows = cur.fetchall()
                 if not rows:
                     break
                 # Filter rows against exclusions before processing to keep processed count aligned with job['total']
-                if exclusion_set:
-                    rows_to_process = [r for r in rows if r['id'] not in exclusion_set]
+                if py_exclusions:
+                    rows_to_process = [r for r in rows if r[0] not in py_exclusions]
                 else:
                     rows_to_process = rows
                 if rows_to_process:
@@ -837,79 +1754,64 @@ def _process_query_scope(where_sql: str, params: List[Any], operation: str, dest
                             sample = rows_to_process[:3]
                             print(f"[DEBUG file_operation] First batch sample (operation={operation} total_est={total}):")
                             for r in sample:
-                                print("  id=", r['id'], "path=", r['file_path'])
+                                print("  id=", r[0], "path=", r[1])
                         except Exception:
                             pass
                         debug_logged = True
                     _process_rows(rows_to_process, operation, dest_abs, conn, job)
-                last_id = rows[-1]['id']
+                last_id = rows[-1][0]
                 job['updated'] = time.time()
     except Exception as e:
         raise e
 
-def _process_rows(rows: Sequence[sqlite3.Row], operation: str, dest_abs: Optional[str], conn: sqlite3.Connection, job: Dict[str, Any]):
-    cur = conn.cursor()
-    for row in rows:
-        try:
-            src = row['file_path']
-            if not _validate_allowed(src):
-                job['errors'].append(f"Outside allowed root: {src}")
-                job['error_count'] += 1
-                continue
-            if operation in {"move", "copy"}:
-                assert dest_abs is not None
-                target = _safe_collision_path(dest_abs, os.path.basename(src))
-                if operation == 'move':
-                    if os.path.exists(src):
-                        shutil.move(src, target)
-                    cur.execute("UPDATE files SET file_path=? WHERE id=?", (target, row['id']))
-                    job['counts']['moved'] += 1
-                else:  # copy
-                    if os.path.exists(src):
-                        shutil.copy2(src, target)
-                    cur.execute(
-                        """
-                        INSERT INTO files (file_path, file_hash, metadata_json, last_scanned, file_size, file_mtime, file_ctime, width, height)
-                        VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?, ?, ?, ?, ?)
-                        ON CONFLICT(file_path) DO NOTHING
-                        """,
-                        (
-                            target,
-                            row['file_hash'] if 'file_hash' in row.keys() else None,
-                            row['metadata_json'] if 'metadata_json' in row.keys() else None,
-                            row['file_size'] if 'file_size' in row.keys() else None,
-                            row['file_mtime'] if 'file_mtime' in row.keys() else None,
-                            row['file_ctime'] if 'file_ctime' in row.keys() else None,
-                            row['width'] if 'width' in row.keys() else None,
-                            row['height'] if 'height' in row.keys() else None,
-                        ),
-                    )
-                    # Only count as copied if DB insert actually succeeded
-                    if cur.rowcount > 0:
-                        job['counts']['copied'] += 1
-            elif operation == 'delete':
-                if os.path.isfile(src):
-                    try:
-                        os.remove(src)
-                    except FileNotFoundError:
-                        pass
-                cur.execute("DELETE FROM files WHERE id=?", (row['id'],))
-                job['counts']['deleted'] += 1
-        except Exception as fe:
-            job['errors'].append(f"{operation} error for id {row['id']}: {fe}")
-            job['error_count'] += 1
-        finally:
-            job['processed'] += 1
-        if len(job['errors']) > 50:
-            # Trim retained errors to first 50
-            job['errors'] = job['errors'][:50]
-    conn.commit()
-    _invalidate_count_cache()
+def _process_rows(rows: Sequence[Tuple[int, str]], operation: str, dest_abs: Optional[str], conn: sqlite3.Connection, job: Dict[str, Any]):
+    # Same phases as /file_operation: plan targets, run the filesystem ops on the
+    # shared pool, then apply the staged DB writes once under the write lock.
+    # Progress is tallied in locals and written back to the job once per batch.
+    # The operation is fixed per job: decide once whether rows get a target
+    with_target = operation in {'move', 'copy'}
+    if with_target:
+        assert dest_abs is not None
+    planned: List[Tuple[int, str, Optional[str]]] = []
+    taken = _dir_names(dest_abs) if with_target else set()
+    errors: List[str] = []
+    processed = 0
+    for file_id, src in rows:
+        if not _validate_allowed(src):
+            errors.append(f"Outside allowed root: {src}")
+            processed += 1
+            continue
+        target = _safe_collision_path(dest_abs, os.path.basename(src), taken) if with_target else None
+        planned.append((file_id, src, target))
+    staged: List[Tuple[int, Any]] = []
+    for (file_id, src, target), fe in zip(planned, _run_fs_ops(operation, planned, missing_ok=True)):
+        processed += 1
+        if fe is not None:
+            errors.append(f"{operation} error for id {file_id}: {fe}")
+        elif with_target:
+            staged.append((file_id, (target, file_id)))
+        else:
+            staged.append((file_id, (file_id,)))
+    with _WRITE_LOCK:
+        affected, db_errors = _apply_file_changes(conn, operation, staged)
+        conn.commit()
+    errors.extend(db_errors)
+    job['processed'] += processed
+    # Copies only count when the insert actually happened (ON CONFLICT DO NOTHING)
+    job['counts'][{'move': 'moved', 'copy': 'copied', 'delete': 'deleted'}[operation]] += affected
+    job['error_count'] += len(errors)
+    # Retain only the first _MAX_JOB_ERRORS messages; the count stays exact
+    kept = job['errors']
+    room = _MAX_JOB_ERRORS - len(kept)
+    if room > 0 and errors:
+        kept.extend(errors[:room])
 
 @app.get("/file_operation_status/{job_id}")
 def file_operation_status(job_id: str):
     with app.state.jobs_lock:  # type: ignore[attr-defined]
         job = app.state.jobs.get(job_id)
+        if job:
+            app.state.jobs.move_to_end(job_id)  # type: ignore[attr-defined]  # polled: keep longest
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     # Shallow copy without scope internals that may be large
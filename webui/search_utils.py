@@ -5,10 +5,21 @@ is consistent across endpoints. Supports optional FTS5 usage and special
 syntaxes:
     - LEN<op><number> : compares LENGTH(metadata_json)
     - {}              : metadata_json = '{}'
+    - field:value     : structured filter on extracted generation params
+                        (model/sampler/lora: case-insensitive prefix,
+                        optional trailing '*';
+                        seed/steps: exact number) via indexed lookups.
+                        Unknown fields or unparsable values are plain text.
 If FTS is enabled (files_fts virtual table present) then queries search across
 metadata_json and file path columns (path, path_norm). Basic terms are wrapped
 in quotes for phrase search unless they already look like an advanced FTS
-expression (boolean ops, parentheses, NEAR, wildcard, quotes).
+expression (boolean ops, parentheses, NEAR, wildcard, quotes). With the trigram
+tokenizer (SQLite >= 3.34) a quoted term is a substring match (``cat`` also
+finds ``concatenate``); terms under 3 characters fall back to LIKE since
+trigram MATCH cannot serve them. An advanced expression with such an operand
+(``xl AND dog``) is translated operand by operand into LIKE clauses so its
+AND / OR / NOT meaning is kept. Older SQLite builds keep the unicode61
+tokenizer: whole-token / phrase matching with prefix indexes.
 
 NOTE: The UI currently presents operator choices AND / OR / NOT where NOT
 is treated as a unary modifier logically equivalent to AND NOT <clause>.
@@ -23,13 +34,32 @@ from sd_index.paths import DB_PATH
 
 LEN_PATTERN = re.compile(r"^LEN\s*([<>]=?|==?)\s*(\d+)\s*$", re.IGNORECASE)
 BOOL_TOKEN_RE = re.compile(r"\b(AND|OR|NOT|NEAR/\d+)\b", re.IGNORECASE)
+# A term is passed to MATCH verbatim when it carries FTS syntax: a boolean
+# operator, NEAR/n, a wildcard, quotes or parentheses. One pass over the term.
+ADVANCED_FTS_RE = re.compile(r'[*"()]|\b(?:AND|OR|NOT|NEAR/\d+)\b', re.IGNORECASE)
 
 ALLOWED_LOGICS = {"AND", "OR", "NOT"}
 
+PREFIX_TERM_RE = re.compile(r'^[^*"()]+\*$')
+# The value must follow the colon directly: 'Steps: 20' is prompt text, 'steps:20' a filter
+FIELD_PATTERN = re.compile(r"^(\w+):(\S.*)$")
+# field -> (table, column) of the extraction tables; each column is indexed
+# (NOCASE for text) so these are index seeks, not JSON scans.
+TEXT_FIELDS = {
+    "model": ("models", "model_name"),
+    "sampler": ("models", "sampler"),
+    "lora": ("lora_usages", "lora_name"),
+}
+NUMBER_FIELDS = {
+    "seed": ("models", "seed"),
+    "steps": ("models", "steps"),
+}
+
 class SearchBuildError(ValueError):
     pass
 
 _PROMPTS_FTS = None
+_FILES_FTS_TRIGRAM = None
 
 def _prompts_fts_exists() -> bool:
     global _PROMPTS_FTS
@@ -44,6 +74,154 @@ def _prompts_fts_exists() -> bool:
         _PROMPTS_FTS = False
     return _PROMPTS_FTS
 
+def _files_fts_trigram() -> bool:
+    """True when files_fts uses the trigram tokenizer (cached like _prompts_fts_exists).
+
+    A missing table (dropped while the indexer bulk-loads) is not cached, so
+    the answer is re-read once the table is back.
+    """
+    global _FILES_FTS_TRIGRAM
+    if _FILES_FTS_TRIGRAM is not None:
+        return _FILES_FTS_TRIGRAM
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            row = conn.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='files_fts'").fetchone()
+    except Exception:
+        return False
+    if not (row and row[0]):
+        return False
+    _FILES_FTS_TRIGRAM = "trigram" in row[0]
+    return _FILES_FTS_TRIGRAM
+
+def reset_fts_probes() -> None:
+    """Forget the cached prompts_fts / tokenizer probes (FTS was re-checked or rebuilt)."""
+    global _PROMPTS_FTS, _FILES_FTS_TRIGRAM
+    _PROMPTS_FTS = None
+    _FILES_FTS_TRIGRAM = None
+
+def _parse_field_term(term: str) -> Tuple[str, str | int] | None:
+    """``(field, value)`` when ``term`` is a structured filter, else None.
+
+    Only known fields with a value that parses count: a whole number for
+    seed/steps, a name without further ':' for model/sampler/lora. Anything
+    else ('lora:detail:0.8' from a <lora:...> prompt, 'seed:abc', 'Steps: 20')
+    is ordinary free text.
+    """
+    m = FIELD_PATTERN.match(term)
+    if not m:
+        return None
+    field, value = m.group(1).lower(), m.group(2).strip()
+    if field in NUMBER_FIELDS:
+        try:
+            return field, int(value)
+        except ValueError:
+            return None
+    if field in TEXT_FIELDS and ':' not in value:
+        value = value.rstrip("*") or value  # 'model:sdxl*' reads naturally; matching is prefix anyway
+        return field, value
+    return None
+
+def _build_field_clause(field: str, value: str | int) -> Tuple[str, List]:
+    if field in NUMBER_FIELDS:
+        table, col = NUMBER_FIELDS[field]
+        return f"id IN (SELECT file_id FROM {table} WHERE {col} = ?)", [value]
+    table, col = TEXT_FIELDS[field]
+    assert isinstance(value, str)
+    # Prefix match as a NOCASE range: [value, value + max code point)
+    return (
+        f"id IN (SELECT file_id FROM {table} WHERE {col} >= ? COLLATE NOCASE AND {col} < ? COLLATE NOCASE)",
+        [value, value + "\U0010ffff"],
+    )
+
+# Tokens of an FTS5 expression: parentheses, "quoted phrases" and bare words
+FTS_TOKEN_RE = re.compile(r'[()]|"[^"]*"|[^\s()"]+')
+_FTS_OPERATORS = frozenset(("AND", "OR", "NOT"))  # FTS5 operators are uppercase only
+_LIKE_CLAUSE = "(metadata_json LIKE ? OR file_path LIKE ?)"
+
+def _fts_token_text(tok: str) -> str:
+    """Text an operand token matches: unquoted, without prefix '*' / initial '^'."""
+    if tok.startswith('"'):
+        return tok[1:-1]
+    return tok.lstrip("^").rstrip("*")
+
+def _has_short_fts_token(term: str) -> bool:
+    """True when an operand of the FTS expression is under 3 characters."""
+    for tok in FTS_TOKEN_RE.findall(term):
+        if tok in "()" or tok in _FTS_OPERATORS or tok.startswith("NEAR"):
+            continue
+        if len(_fts_token_text(tok)) < 3:
+            return True
+    return False
+
+def _like_boolean_clause(term: str) -> Tuple[str, List] | None:
+    """Translate an FTS5 boolean expression into LIKE clauses, or None.
+
+    Used where trigram MATCH cannot serve the expression (an operand under 3
+    characters): operands become substring LIKEs, adjacent operands are ANDed
+    as in FTS5, and ``a NOT b`` becomes ``a AND NOT b``. SQL's precedence
+    (NOT > AND > OR) matches FTS5's. NEAR groups and malformed input give None.
+    """
+    parts: List[str] = []
+    params: List = []
+    depth = 0
+    prev_operand = False
+    for tok in FTS_TOKEN_RE.findall(term):
+        if tok in _FTS_OPERATORS:
+            if not prev_operand:
+                return None
+            parts.append("AND NOT" if tok == "NOT" else tok)
+            prev_operand = False
+        elif tok == "(":
+            if prev_operand:
+                parts.append("AND")
+            parts.append("(")
+            depth += 1
+            prev_operand = False
+        elif tok == ")":
+            if not prev_operand or depth == 0:
+                return None
+            parts.append(")")
+            depth -= 1
+        elif tok.startswith("NEAR"):
+            return None
+        else:
+            text = _fts_token_text(tok)
+            if not text:
+                return None
+            if prev_operand:
+                parts.append("AND")
+            pat = f"%{text}%"
+            parts.append(_LIKE_CLAUSE)
+            params += [pat, pat]
+            prev_operand = True
+    if not prev_operand or depth:
+        return None
+    return "(" + " ".join(parts) + ")", params
+
+def _fts_match_expr(term: str, plain: str) -> str | None:
+    """MATCH expression for a free-text term, or None when it must use LIKE."""
+    advanced = ADVANCED_FTS_RE.search(term)
+    # Trigram FTS cannot match operands shorter than 3 chars (a whole plain term,
+    # or any word / phrase of an advanced expression); those use the LIKE path.
+    if _files_fts_trigram() and (len(plain) < 3 or (advanced and _has_short_fts_token(term))):
+        return None
+    return term if advanced else f'"{term}"'
+
+def rank_match(search: str, has_fts: bool) -> str | None:
+    """files_fts MATCH expression to rank ``search`` by (bm25), or None.
+
+    None when FTS is off or the main search is not a free-text term (LEN,
+    ``{}``, field:value, or too short for trigram), i.e. when there is no
+    relevance to order by.
+    """
+    term = (search or "").strip()
+    if not has_fts or not term or term == '{}' or LEN_PATTERN.match(term):
+        return None
+    if _parse_field_term(term) is not None:
+        return None
+    plain = term[:-1].rstrip() if PREFIX_TERM_RE.match(term) and not BOOL_TOKEN_RE.search(term) else term
+    return _fts_match_expr(term, plain)
+
 def _build_single_clause(term: str, has_fts: bool) -> Tuple[str, List]:
     term = term.strip()
     if not term:
@@ -58,17 +236,33 @@ def _build_single_clause(term: str, has_fts: bool) -> Tuple[str, List]:
         return f"LENGTH(metadata_json) {op} ?", [num]
     if term == '{}':
         return "metadata_json = ?", ['{}']
-    if has_fts:
-        advanced = bool(BOOL_TOKEN_RE.search(term) or any(ch in term for ch in ['*', '"', '(', ')']))
-        fts_query = term if advanced else f'"{term}"'
+    field = _parse_field_term(term)
+    if field is not None:
+        return _build_field_clause(*field)
+    # 'val*' asks for a prefix. MATCH handles it natively; substring LIKE already
+    # implies it, so the LIKE path drops the star rather than matching it literally.
+    plain = term[:-1].rstrip() if PREFIX_TERM_RE.match(term) and not BOOL_TOKEN_RE.search(term) else term
+    fts_query = _fts_match_expr(term, plain) if has_fts else None
+    if fts_query is not None:
         if _prompts_fts_exists():
             return (
                 "id IN (SELECT rowid FROM files_fts WHERE files_fts MATCH ? UNION SELECT rowid FROM prompts_fts WHERE prompts_fts MATCH ?)",
                 [fts_query, fts_query]
             )
         return ("id IN (SELECT rowid FROM files_fts WHERE files_fts MATCH ?)", [fts_query])
-    # Fallback LIKE across metadata and file_path
-    return "(metadata_json LIKE ? OR file_path LIKE ?)", [f"%{term}%", f"%{term}%"]
+    if has_fts and ADVANCED_FTS_RE.search(term):
+        # An FTS expression MATCH could not take keeps its boolean meaning
+        boolean = _like_boolean_clause(term)
+        if boolean is not None:
+            return boolean
+    # Fallback LIKE across metadata and file_path: one pattern object bound twice.
+    # Stays positional: ?NNN / named params would clash with the ? numbering of
+    # the other clauses build_where concatenates.
+    pat = f"%{plain}%"
+    return "(metadata_json LIKE ? OR file_path LIKE ?)", [pat, pat]
+
+# unary NOT is emitted as AND NOT
+_OP_PREFIX = {'AND': 'AND (', 'OR': 'OR (', 'NOT': 'AND NOT ('}
 
 def build_where(search: str, logics: Sequence[str], values: Sequence[str], has_fts: bool) -> Tuple[str, List]:
     """Return (where_sql, params) WITHOUT the leading 'WHERE'.
@@ -101,17 +295,10 @@ def build_where(search: str, logics: Sequence[str], values: Sequence[str], has_f
     if not clauses:
         return "", []
 
-    # Construct SQL
-    where_parts = []
-    params: List = []
-    for idx, (sql, p) in enumerate(clauses):
-        if idx == 0:
-            where_parts.append(f"({sql})")
-        else:
-            op = clause_ops[idx - 1]
-            if op == 'NOT':
-                where_parts.append(f"AND NOT ({sql})")  # unary NOT as AND NOT
-            else:
-                where_parts.append(f"{op} ({sql})")
+    # Construct SQL: prefixes are looked up, not formatted, per clause
+    where_parts = ['(' + clauses[0][0] + ')']
+    params: List = list(clauses[0][1])
+    for (sql, p), op in zip(clauses[1:], clause_ops):
+        where_parts.append(_OP_PREFIX[op] + sql + ')')
         params.extend(p)
     return ' '.join(where_parts), params